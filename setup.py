@@ -1,3 +1,30 @@
+import os
+
 from setuptools import setup
 
-setup()
\ No newline at end of file
+ext_modules = []
+
+# Compiled modules are opt-in (PYBOOL_IR_COMPILE=1), since they need a C compiler, and an extension module that is built
+# in place shadows the .py file next to it, so later edits to the .py file would be silently ignored.
+COMPILE = os.environ.get("PYBOOL_IR_COMPILE") == "1"
+
+# The compiled date parsing functions are optional, pybool_ir falls back to pure Python when they are not built.
+if COMPILE:
+    try:
+        from Cython.Build import cythonize
+
+        ext_modules += cythonize(["src/pybool_ir/index/_pubmed_fast.pyx"], language_level=3)
+    except ImportError:
+        pass
+
+# The OVID query converter is plain (typed) Python, so it can be compiled with mypyc (which is part of mypy).
+# mypyc type checks the modules that ovid.py imports, so this is also opt-in, rather than done whenever mypy is installed.
+if COMPILE:
+    try:
+        from mypyc.build import mypycify
+
+        ext_modules += mypycify(["--ignore-missing-imports", "src/pybool_ir/query/ovid.py"])
+    except ImportError:
+        pass
+
+setup(ext_modules=ext_modules)
@@ -118,9 +118,19 @@ def pubmed_process(baseline_path: Path, output_path: Path):
     required=False,
     help="whether to store fields or not"
 )
-def pubmed_index(baseline_path: Path, index_path: Path, store_fields: bool):
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    default=1,
+    type=click.INT,
+    multiple=False,
+    required=False,
+    help="number of processes used to parse baseline files"
+)
+def pubmed_index(baseline_path: Path, index_path: Path, store_fields: bool, workers: int):
     from pybool_ir.index.pubmed import PubmedIndexer
-    with PubmedIndexer(Path(index_path), store_fields=store_fields) as ix:
+    with PubmedIndexer(Path(index_path), store_fields=store_fields, workers=workers) as ix:
         ix.bulk_index(Path(baseline_path))
 
 
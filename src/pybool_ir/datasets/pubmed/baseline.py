@@ -15,7 +15,7 @@ def download_baseline(path: Path):
 
     os.makedirs(str(path), exist_ok=True)
 
-    for filename in reversed(datautils.dir_to_filenames(files)):
+    for filename in reversed(list(datautils.dir_to_filenames(files))):
         if os.path.exists(str(path / filename)):
             print(f"found {path / filename}, skipping")
             continue
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator
 
 import requests
 
@@ -14,7 +14,11 @@ MESH_YEAR = "2022"
 MESH_URL = f"https://nlmpubs.nlm.nih.gov/projects/mesh/{MESH_YEAR}/meshtrees/"
 
 
-def dir_to_filenames(listing: List[str]) -> List[str]:
-    return [fname for fname in [x.split(" ")[-1] for x in listing] if fname.endswith(".gz")]
+def dir_to_filenames(listing: Iterable[str]) -> Iterator[str]:
+    for line in listing:
+        # The file name is the last column of the listing.
+        fname = line.rsplit(" ", 1)[-1]
+        if fname.endswith(".gz"):
+            yield fname
 
 
@@ -1,6 +1,7 @@
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import appdirs
 
@@ -38,6 +39,14 @@ class MeSHTree:
                 self.headings.append((location.strip(), heading))
         self._minimum_short_mesh_length = minimum_short_mesh_length
         self._short_mesh_headings = set([k for k in self.locations.keys() if len(k) <= minimum_short_mesh_length])
+        # Index of the (analyzed) headings by the trigrams they contain, see `headings_containing`.
+        # It is only built when it is first needed.
+        self._heading_keys = None
+        self._headings_by_trigram = None
+        # The same headings are exploded (and mapped) for many atoms and queries, so the results are cached.
+        # Each tree has its own caches, so they go away along with the tree.
+        self._explode_cached = lru_cache(maxsize=4096)(self._explode)
+        self._map_heading_cached = lru_cache(maxsize=4096)(self._map_heading)
 
     @property
     def short_mesh_headings(self) -> set:
@@ -47,18 +56,38 @@ class MeSHTree:
     def minimum_short_mesh_length(self) -> int:
         return self._minimum_short_mesh_length
 
-    def explode(self, heading: str) -> List[str]:
+    def headings_containing(self, text: str) -> List[str]:
+        """
+        Find all the (analyzed) headings that contain `text`, in the order that they appear in the tree.
+        """
+        if len(text) < 3:
+            return [x for x in self.locations.keys() if text in x]
+        if self._headings_by_trigram is None:
+            self._heading_keys = list(self.locations.keys())
+            self._headings_by_trigram = {}
+            for i, heading in enumerate(self._heading_keys):
+                for trigram in {heading[j:j + 3] for j in range(len(heading) - 2)}:
+                    self._headings_by_trigram.setdefault(trigram, []).append(i)
+        # Any heading that contains the text also contains every trigram of the text,
+        # so only the headings with the least common trigram need to be checked.
+        candidates = min((self._headings_by_trigram.get(text[j:j + 3], ()) for j in range(len(text) - 2)), key=len)
+        return [self._heading_keys[i] for i in candidates if text in self._heading_keys[i]]
+
+    def explode(self, heading: str) -> Tuple[str, ...]:
+        return self._explode_cached(heading)
+
+    def map_heading(self, heading: str) -> str:
+        return self._map_heading_cached(heading)
+
+    def _explode(self, heading: str) -> Tuple[str, ...]:
         analyzed_heading = analyze_mesh(heading)
         if analyzed_heading not in self.locations:
-            return []
+            return ()
         index = self.locations[analyzed_heading]
         exploded_location, exploded_heading = self.headings[index]
-        for indexed_heading in self.headings[index:]:
-            location, heading = indexed_heading
-            if location.startswith(exploded_location):
-                yield heading
+        return tuple(heading for location, heading in self.headings[index:] if location.startswith(exploded_location))
 
-    def map_heading(self, heading: str) -> str:
+    def _map_heading(self, heading: str) -> str:
         analyzed_heading = analyze_mesh(heading)
         if analyzed_heading not in self.locations:
             return heading
@@ -1,12 +1,20 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ftplib import FTP
 from pathlib import Path
 
+from tqdm.auto import tqdm
+
 from pybool_ir.datasets.pubmed import datautils
 from pybool_ir.datasets.pubmed.datautils import FTP_URL, FTP_PMC_CWD
 
 
-def download_baseline(path: Path):
+def download_baseline(path: Path, workers: int = 8):
+    """
+    Download the PMC baseline from the NCBI FTP server.
+    A single FTP stream is slow for so many files, so `workers` files are downloaded at once.
+    """
     with FTP(host=FTP_URL, user="anonymous") as ftp:
         ftp.cwd(FTP_PMC_CWD)
         files = []
@@ -14,11 +22,32 @@ def download_baseline(path: Path):
 
     os.makedirs(str(path), exist_ok=True)
 
-    for filename in reversed(datautils.dir_to_filenames(files)):
+    filenames = []
+    for filename in reversed(list(datautils.dir_to_filenames(files))):
         if os.path.exists(str(path / filename)):
             print(f"found {path / filename}, skipping")
             continue
-        # TODO: implement downloading PMC files.
-        # datautils.download_single(path, filename)
+        filenames.append(filename)
+
+    # Each thread opens one connection, which it then uses to download all of its files.
+    local = threading.local()
+    connections = []
+
+    def _download(fname: str):
+        if not hasattr(local, "ftp"):
+            local.ftp = FTP(host=FTP_URL, user="anonymous")
+            local.ftp.cwd(FTP_PMC_CWD)
+            connections.append(local.ftp)
+        # Download to a temporary file, so that interrupted downloads are not skipped next time.
+        part = path / f"{fname}.part"
+        with open(part, "wb") as f:
+            local.ftp.retrbinary(f"RETR {fname}", f.write)
+        os.replace(part, path / fname)
 
-    ftp.close()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in tqdm(executor.map(_download, filenames), desc="files downloaded", total=len(filenames)):
+                pass
+    finally:
+        for connection in connections:
+            connection.close()
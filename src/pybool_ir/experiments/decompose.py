@@ -18,6 +18,7 @@ d 1000
 
 """
 from abc import ABC, abstractmethod
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Callable
@@ -114,7 +115,7 @@ class DecomposeRetrievalExperiment(RetrievalExperiment):
         # Apply dates here.
         if not self.ignore_dates:
             topic = self._topics[query_id]
-            node = OperatorNode("AND", [node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)])
+            node = OperatorNode("AND", (node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)))
         lucene_query = self.query_parser.transform(node)
         count = None
 
@@ -133,7 +134,7 @@ class DecomposeRetrievalExperiment(RetrievalExperiment):
         if isinstance(node, AtomNode):
             # Borked parsing issue.
             if not isinstance(node.field, str):
-                node.field = node.field.field
+                node = replace(node, field=node.field.field)
             return self._query_atom(node, query_id)
         elif isinstance(node, OperatorNode):
             return self._query_operator(node, query_id)
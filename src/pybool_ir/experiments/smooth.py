@@ -7,6 +7,7 @@ NB: See the bottom of this file for experiments and more details, like accessing
 import os
 import pickle
 from abc import ABC, abstractmethod
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Tuple
@@ -201,7 +202,7 @@ class QueryExperiment(RetrievalExperiment):
         # Apply dates here.
         if not self.ignore_dates:
             topic = self.topics[query_id]
-            node = OperatorNode("AND", [node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)])
+            node = OperatorNode("AND", (node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)))
         lucene_query = self.query_parser.transform(node)
         count = None
 
@@ -239,7 +240,7 @@ class QueryExperiment(RetrievalExperiment):
         if isinstance(node, AtomNode):
             # Borked parsing issue.
             if isinstance(node.field, _FieldUnit):
-                node.field = node.field.field
+                node = replace(node, field=node.field.field)
             return self.query_atom(node, query_id)
         elif isinstance(node, OperatorNode):
             return self.query_operator(node, query_id)
@@ -267,7 +268,7 @@ class PrecomputedQueryExperiment(QueryExperiment):
         # Apply dates here.
         if not self.ignore_dates:
             topic = self.topics[query_id]
-            node = OperatorNode("AND", [node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)])
+            node = OperatorNode("AND", (node, AtomNode(f"{topic.date_from}:{topic.date_to}", self.date_field)))
 
         lucene_query = self.query_parser.transform(node)
         count = None
@@ -307,16 +308,15 @@ class PredictorQueryExperiment(QueryExperiment):
     """
 
     def query_operator(self, node: OperatorNode, query_id, depth=0) -> (List[int], ASTNode):
-        node_copy = OperatorNode(operator=node.operator, children=[])
-
         # Recursively get the hits for each child.
         child_hits = []
+        children_copy = []
         for i, child in enumerate(node.children):
             hits, child_node_copy = self.hits_recurse(child, query_id, depth + 1)
             if isinstance(child, OperatorNode):
-                node_copy.children.append(child_node_copy)
+                children_copy.append(child_node_copy)
             else:
-                node_copy.children.append(child)
+                children_copy.append(child)
             child_hits.append(list(hits))
 
         # Calculate theta for this operator.
@@ -360,14 +360,13 @@ class PredictorQueryExperiment(QueryExperiment):
 
         node_op = f"{node.operator}@{theta}"
         print(node_op, [len(x) for x in child_hits], len(results), "-", depth)
-        node_copy.operator = node_op
-        return results, node_copy
+        return results, OperatorNode(operator=node_op, children=tuple(children_copy))
 
     def hits_recurse(self, node, query_id, depth=0) -> (List[int], ASTNode):
         if isinstance(node, AtomNode):
             # Borked parsing issue.
             if isinstance(node.field, _FieldUnit):
-                node.field = node.field.field
+                node = replace(node, field=node.field.field)
             return self.query_atom(node, query_id), None
         elif isinstance(node, OperatorNode):
             return self.query_operator(node, query_id, depth=depth)
@@ -396,7 +395,7 @@ class OracleQueryExperiment(QueryExperiment):
         if isinstance(node, AtomNode):
             # Borked parsing issue.
             if isinstance(node.field, _FieldUnit):
-                node.field = node.field.field
+                node = replace(node, field=node.field.field)
             return self.query_atom(node, query_id), node
         elif isinstance(node, OperatorNode):
             return self.query_operator(node, query_id)
@@ -430,8 +429,10 @@ class OracleQueryExperiment(QueryExperiment):
             raise Exception("unknown operator", node.operator)
 
         child_hits = []
+        children_copy = []
         for i, child in enumerate(node.children):
-            hits, _ = self.hits_recurse(child, query_id)
+            hits, child_node_copy = self.hits_recurse(child, query_id)
+            children_copy.append(child_node_copy)
             child_hits.append(list(hits))
 
         node_op = node.operator
@@ -492,8 +493,7 @@ class OracleQueryExperiment(QueryExperiment):
         node_op = f"{node.operator}@{best_theta}"
 
         print(node_op, [len(x) for x in child_hits], len(results))
-        node.operator = node_op
-        return results, node
+        return results, OperatorNode(operator=node_op, children=tuple(children_copy))
 
     def _retrieval(self) -> List[ScoredDoc]:
         for query_id, ast_node in tqdm(self.queries.items(), desc="retrieval"):
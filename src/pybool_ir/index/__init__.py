@@ -4,6 +4,13 @@ It includes the Document class, which is used to represent documents in pybool_i
 It also includes generic and off-the-shelf indexing pipelines.
 """
 
-from .index import Indexer
-
 __all__ = ["Indexer"]
+
+
+def __getattr__(name):
+    # Indexer is imported on first access, so that modules in this package which do not need lucene
+    # (e.g., the PubMed XML parsing run in worker processes) can be imported without starting the JVM.
+    if name == "Indexer":
+        from .index import Indexer
+        return Indexer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,98 @@
+# cython: language_level=3
+"""
+Compiled versions of the Medline date parsing functions in `pybool_ir.index._pubmed_xml`.
+These run once for every article that is indexed, so they are worth compiling.
+When this extension is not built, `pybool_ir.index._pubmed_xml` falls back to the pure Python versions.
+"""
+
+from pybool_ir.index._pubmed_xml import DEFAULT_YEAR, DEFAULT_MONTH, DEFAULT_DAY, _possible_days, _possible_months, _search_month, \
+    _DATE_TRANS, _DATE_RANGE_RE
+
+cdef dict _days = _possible_days
+cdef dict _months = _possible_months
+
+
+cpdef tuple day_str_to_day(str day_str):
+    cdef object day
+    if day_str.isdigit():
+        return day_str, True
+    day = _days.get(day_str)
+    if day is not None:
+        return day, True
+    return day_str, False
+
+
+cpdef int month_str_to_month(str month_str, bint fail_on_nonparseable_str=False) except? -1:
+    cdef object month
+    cdef str err
+
+    # If we have a digit, just return it and assume month.
+    if month_str.isdigit():
+        return int(month_str)
+
+    month_str = month_str.lower()
+
+    # Multiple months (e.g., Oct-Dec) are set to the first month.
+    if "-" in month_str:
+        month_str = month_str.split("-")[0]
+    elif "/" in month_str:
+        month_str = month_str.split("/")[0]
+
+    if month_str.isdigit():
+        return int(month_str)
+
+    month = _months.get(month_str)
+    if month is not None:
+        return month
+
+    month = _search_month(month_str)
+    if month is not None:
+        return month
+
+    err = f"{month_str} is not a parseable string"
+    if fail_on_nonparseable_str:
+        raise KeyError(err)
+    print(err)
+    return 1
+
+
+cpdef tuple parse_medline_date(str date_str):
+    cdef str day = str(DEFAULT_DAY)
+    cdef str month = str(DEFAULT_MONTH)
+    cdef str year = str(DEFAULT_YEAR)
+    cdef list dur_parts, date_parts
+    cdef bint is_day
+
+    date_str = _DATE_RANGE_RE.sub("-", date_str.lower().translate(_DATE_TRANS))
+    dur_parts = date_str.split("-")
+    if len(dur_parts) > 1:
+        date_str = dur_parts[0]
+
+    date_parts = date_str.split()
+    if len(date_parts) == 1:
+        if date_parts[0].isdigit():
+            year = date_parts[0]
+        else:
+            month = date_parts[0]
+    elif len(date_parts) == 2:
+        year, month = date_parts
+    elif len(date_parts) >= 3:
+        year, month, day = date_parts[:3]
+        if day.lower() == "quarter":
+            month = f"{month} {day}"
+            day = "1"
+    else:
+        raise Exception(f"{date_str} is unparseable\nguru meditation: {date_parts}")
+
+    if not year.isdigit():
+        year, month = month, year
+
+    day, is_day = day_str_to_day(day)
+    if not is_day:
+        day, month = month, day
+        day, is_day = day_str_to_day(day)
+
+    if not day.isdigit():
+        day = str(DEFAULT_DAY)
+
+    return int(year), month_str_to_month(month), int(day)
@@ -0,0 +1,387 @@
+"""
+Parsing of PubMed XML files. This module does not import lucene, so that the worker processes of
+`pybool_ir.index.pubmed.PubmedIndexer.read_folder_parallel` can parse files without starting a JVM.
+"""
+
+import gzip
+import re
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+import lxml.etree as et
+from lxml.etree import _Element as Element
+
+DEFAULT_YEAR = 1900
+DEFAULT_MONTH = 1
+DEFAULT_DAY = 1
+
+# Number of days in each month (indexed from 1), as in calendar.mdays.
+_MDAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_possible_days = {"1st": "1", "2nd": "2", "3rd": "3"}
+for _i in range(31):
+    str_i = str(_i)
+    _possible_days[f"{_i}th"] = str_i
+
+
+def _day_str_to_day(day_str: str) -> Tuple[str, bool]:
+    if day_str.isdigit():
+        return day_str, True
+    if day_str in _possible_days:
+        return _possible_days[day_str], True
+    return day_str, False
+
+
+# Journals vary in the way the publication date appears on an issue.
+# Some journals include just the year, whereas others include the year
+# plus month or year plus month plus day. And, some journals use the
+# year and season (e.g., Winter 1997). The publication date in the
+# citation is recorded as it appears in the journal.
+_months = {
+    # Short English months.
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+    "set": 9,
+    # Full English months.
+    "january": 1,
+    "february": 2,
+    "march": 3,
+    "april": 4,
+    "june": 6,
+    "july": 7,
+    "august": 8,
+    "september": 9,
+    "october": 10,
+    "november": 11,
+    "december": 12,
+    # Full German month names.
+    "januar": 1,
+    "februar": 2,
+    "marz": 3,
+    "märz": 3,
+    "mai": 5,
+    "juni": 6,
+    "juli": 7,
+    "oktober": 10,
+    "dezember": 12,
+    # Unknown language month names.
+    "desember": 12,  # Indonesian?
+}
+
+# Dates with a season are set as:
+# winter = January, spring = April, summer = July and fall = October.
+_seasons = {"winter": 1,
+            "spring": 4,
+            "summer": 7,
+            "fall": 10,
+            "autumn": 10,
+            "aut": 10,
+            "[season]": 1}
+
+# There is no "official" documentation for how these dates are interpreted.
+# So let's just use the same dates as the seasons as a pretty good guess.
+_quarters = {
+    "1st quarter": 1,
+    "2nd quarter": 4,
+    "3rd quarter": 7,
+    "4th quarter": 10,
+    "first quarter": 1,
+    "second quarter": 4,
+    "third quarter": 7,
+    "fourth quarter": 10,
+}
+
+_possible_months = {**_months, **_seasons, **_quarters}
+
+# Month names contained in a month string are found with a single Aho-Corasick automaton when pyahocorasick is
+# installed. Each name is stored with its position in `_possible_months`, so the name that comes first in the
+# dict wins when several match, as in the plain substring scan.
+try:
+    import ahocorasick
+
+    _month_automaton = ahocorasick.Automaton()
+    for _i, (_k, _v) in enumerate(_possible_months.items()):
+        _month_automaton.add_word(_k, (_i, _v))
+    _month_automaton.make_automaton()
+except ImportError:
+    _month_automaton = None
+
+
+def _search_month(month_str: str) -> Union[int, None]:
+    if _month_automaton is not None:
+        matches = [v for _, v in _month_automaton.iter(month_str)]
+        if matches:
+            return int(min(matches)[1])
+        return None
+    for k, v in _possible_months.items():
+        if k in month_str:
+            return int(v)
+    return None
+
+
+def _month_str_to_month(month_str: str, fail_on_nonparseable_str: bool = False) -> int:
+    # Strange months that fail to parse
+    # metaboliche -> ?
+    # easter -> ?
+    # trimest -> ?
+    # qctober -> misspelling of October.
+    # oktober -> German for October.
+    # suppl -> ?
+    # abr -> ?
+    # aig -> ?
+    # ago -> ?
+    # aut -> Autumn (?)
+    # dic -> ?
+    # mai -> German for May (?)
+    # mac -> ?
+    # noc -> ?
+    # oc -> ?
+    # t -> ?
+    # c -> ?
+
+    # If we have a digit, just return it and assume month.
+    if month_str.isdigit():
+        return int(month_str)
+
+    # Otherwise, first we need to make the string lower case.
+    month_str = month_str.lower()
+
+    # Publication dates without a month are set to January, multiple
+    # months (e.g., Oct-Dec) are set to the first month.
+    if "-" in month_str:
+        parts = month_str.split("-")
+        month_str = parts[0]
+    elif "/" in month_str:
+        parts = month_str.split("/")
+        month_str = parts[0]
+
+    if month_str.isdigit():
+        return int(month_str)
+
+    if month_str in _possible_months:
+        return _possible_months[month_str]
+
+    month = _search_month(month_str)
+    if month is not None:
+        return month
+
+    # We may wish to gracefully fail, but if not,
+    # just assume the month string is garbage and
+    # by default return January as the month.
+    err = f"{month_str} is not a parseable string"
+    if fail_on_nonparseable_str:
+        raise KeyError(err)
+    else:
+        print(err)
+        return 1
+
+
+# Punctuation that is removed from Medline dates, and separators of date ranges (e.g., "Dec 1999 to Jan 2000").
+_DATE_TRANS = str.maketrans({".": "", ",": ""})
+_DATE_RANGE_RE = re.compile(r" (?:to|&) ")
+
+
+def parse_medline_date(date_str: str) -> Tuple[int, int, int]:
+    """
+    Parse a date string from a Medline record. The returned value is a tuple of (year, month, day).
+
+    The following is a needlessly complicated, yet accurate implementation
+    of how Pubmed handles the publication date of documents.
+    For more information about the nuances of this technical marvel, see:
+    https://pubmed.ncbi.nlm.nih.gov/help/#dp
+    """
+    day = str(DEFAULT_DAY)
+    month = str(DEFAULT_MONTH)
+    year = str(DEFAULT_YEAR)
+    date_str = _DATE_RANGE_RE.sub("-", date_str.lower().translate(_DATE_TRANS))
+    dur_parts = date_str.split("-")
+    # Now that we have the LHS of the duration,
+    # let's parse it like normal.
+    if len(dur_parts) > 1:
+        date_str = dur_parts[0]
+
+    # We now have to split the string and run some
+    # tests to determine what the parts of the date are.
+    date_parts = date_str.split()
+
+    if len(date_parts) == 1:  # Likely we are looking at a year.
+        if date_parts[0].isdigit():  # Almost certainly a year.
+            year = date_parts[0]
+        else:  # If not, it almost certainly is a month.
+            month = date_parts[0]
+
+    elif len(date_parts) == 2:  # Almost certainly a year and a month.
+        year, month = date_parts
+    elif len(date_parts) >= 3:  # Almost certainly a year-month-day combination.
+        year, month, day = date_parts[:3]
+        # Oops, some dates look like `2021 4th Quarter`,
+        # so we need to do a switch-a-roo.
+        if day.lower() == "quarter":
+            month = f"{month} {day}"
+            day = "1"
+    else:
+        raise Exception(f"{date_str} is unparseable\nguru meditation: {date_parts}")
+
+    # For the case that the date is something like `Fall 2021`
+    # instead of the more typical `2021 Fall`:
+    if not year.isdigit():
+        year, month = month, year
+
+    # Let's find out if the day could be a day.
+    day, is_day = _day_str_to_day(day)
+    if not is_day:  # Hmm, maybe the day isn't a day.
+        # Therefore, the day is likely a month!
+        day, month = month, day
+        day, _ = _day_str_to_day(day)
+
+    # Hail Mary at this point, who knows what the day is!
+    if not day.isdigit():
+        day = str(DEFAULT_DAY)
+
+    # Now we can convert the parts to ints for our proper datetime object.
+    year = int(year) if year is not None else DEFAULT_YEAR
+    month = _month_str_to_month(month) if month is not None else DEFAULT_MONTH  # Special parsing for months.
+    day = int(day) if day is not None else DEFAULT_DAY
+    return year, month, day
+
+
+# Prefer the compiled versions of the date parsing functions above when the extension has been built.
+try:
+    from pybool_ir.index._pubmed_fast import parse_medline_date, month_str_to_month as _month_str_to_month, day_str_to_day as _day_str_to_day
+except ImportError:
+    pass
+
+
+# The same MeSH headings, supplementary concepts, and publication types occur in millions of articles.
+# Sharing one string object for each of them keeps memory down while indexing, and makes them cheaper to pickle.
+# The cache is bounded, in case of unusual input.
+_intern = lru_cache(maxsize=200_000)(lambda s: s)
+
+# Paths of the elements of a PubmedArticle node, compiled once rather than for every article.
+_PMID_PATH = et.XPath("MedlineCitation/PMID")
+_PUB_DATE_PATH = et.XPath("MedlineCitation/Article/Journal/JournalIssue/PubDate")
+_TITLE_PATH = et.XPath("MedlineCitation/Article/ArticleTitle")
+_ABSTRACT_PATH = et.XPath("MedlineCitation/Article/Abstract/AbstractText")
+_PUBLICATION_TYPE_PATH = et.XPath("MedlineCitation/Article/PublicationTypeList/PublicationType")
+_MESH_HEADING_PATH = et.XPath("MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName")
+_MESH_MAJOR_HEADING_PATH = et.XPath("MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName[@MajorTopicYN='Y']")
+_MESH_QUALIFIER_PATH = et.XPath("MedlineCitation/MeshHeadingList/MeshHeading/QualifierName")
+_CHEMICAL_PATH = et.XPath("MedlineCitation/ChemicalList/Chemical/NameOfSubstance")
+_SUPPL_MESH_PATH = et.XPath("MedlineCitation/SupplMeshList/SupplMeshName")
+_KEYWORD_PATH = et.XPath("MedlineCitation/KeywordList/Keyword")
+
+
+def parse_pubmed_article_fields(element: Element) -> dict:
+    """
+    Parse a PubmedArticle node from a Pubmed XML element into the fields of a `pybool_ir.index.pubmed.PubmedArticle`.
+    """
+    pmid = _PMID_PATH(element)[0].text
+    article_date: datetime
+    journal_date_element = next(iter(_PUB_DATE_PATH(element)), None)
+    medline_date: Element
+    if journal_date_element is not None:
+        medline_date = journal_date_element.find("MedlineDate")
+        if medline_date is not None:
+            year, month, day = parse_medline_date(medline_date.text)
+        else:
+            year = journal_date_element.find("Year")
+            month = journal_date_element.find("Month") or journal_date_element.find("Season")
+            day = journal_date_element.find("Day")
+
+            year = int(year.text) if year is not None else DEFAULT_YEAR
+            month = _month_str_to_month(month.text) if month is not None else DEFAULT_MONTH
+            day = int(day.text) if day is not None else DEFAULT_DAY
+
+        # Okay, *finally* we have integer representations.
+        # First, the month could be less than 1. (!?)
+        if month < 1:
+            month = DEFAULT_MONTH
+
+        # If the "month" is >12, likely the day and month need switching.
+        if month > 12:
+            month, day = day, month
+
+        # If for some reason, the day exceeds the number of days
+        # in a specific month, then just reset the day to the first.
+        ndays = _MDAYS[month] + (month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0))
+        if day > ndays:
+            day = DEFAULT_DAY
+
+        if year < 1700:
+            year = DEFAULT_YEAR
+
+        article_date = datetime(year=year, month=month, day=day)
+    else:
+        raise Exception("no journal date element found")
+    abstract_el = _ABSTRACT_PATH(element)
+    chemical_list_el = _CHEMICAL_PATH(element)
+    suppl_mesh_list_el = _SUPPL_MESH_PATH(element)
+    return dict(
+        id=pmid,
+        date=article_date,
+        # date_revised=field_data.YES if article_revised_element is not None else field_data.NO,
+        title="".join(_TITLE_PATH(element)[0].itertext()),
+        abstract=" ".join(["".join(x.itertext()) for x in abstract_el]),
+        publication_type=[
+            _intern(el.text)
+            for el in _PUBLICATION_TYPE_PATH(element)
+        ],
+        mesh_heading_list=[
+            _intern(el.text)
+            for el in _MESH_HEADING_PATH(element)
+        ],
+        mesh_major_heading_list=[
+            _intern(el.text)
+            for el in _MESH_MAJOR_HEADING_PATH(element)
+        ],
+        mesh_qualifier_list=[
+            _intern(el.text)
+            for el in _MESH_QUALIFIER_PATH(element)
+        ],
+        supplementary_concept_list=[
+            _intern(el.text)
+            for els in (chemical_list_el, suppl_mesh_list_el)
+            for el in els
+        ],
+        keyword_list=[
+            el.text for el in _KEYWORD_PATH(element)
+        ],
+    )
+
+
+def read_file_fields(fname: Path) -> Iterable[dict]:
+    """
+    Read a single file, yielding the fields of each article. Supports both XML and GZipped XML files.
+    The file is parsed incrementally, so only the article currently being parsed is kept in memory.
+    """
+    if str(fname).endswith(".gz"):
+        source = gzip.open(fname, "rb")
+    elif str(fname).endswith(".xml"):
+        source = open(fname, "rb")
+    else:
+        raise Exception("file type not supported by parser")
+    with source:
+        for _, element in et.iterparse(source, events=("end",), tag="PubmedArticle", huge_tree=True):
+            yield parse_pubmed_article_fields(element)
+            # Drop the articles that have already been parsed.
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _read_file_fields(fname: Path) -> List[dict]:
+    # Runs in a worker process of `PubmedIndexer.read_folder_parallel`.
+    # Plain dicts of fields are sent back, since they are cheaper to pickle than documents.
+    return list(read_file_fields(fname))
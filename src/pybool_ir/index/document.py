@@ -4,6 +4,7 @@ Implementation for how documents are represented in pybool_ir.
 
 import json
 from datetime import datetime
+from typing import Union
 
 import lucene
 import parsedatetime as pdt
@@ -12,6 +13,12 @@ assert lucene.getVMEnv() or lucene.initVM()
 
 _cal = pdt.Calendar()
 
+# orjson parses JSON considerably faster than the json module, so use it when it is installed.
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 
 class Document(object):
     """
@@ -29,21 +36,35 @@ class Document(object):
     @staticmethod
     def from_dict(data: dict):
         if "date" in data:  # Kind of a hack.
-            if isinstance(data["date"], str):
-                data["date"] = _cal.parseDT(data["date"])[0]
+            date = data["date"]
+            if isinstance(date, str):
+                # Almost all dates are ISO-8601, which can be parsed much faster than by parsedatetime.
+                try:
+                    data["date"] = datetime.fromisoformat(date[:19])
+                except ValueError:
+                    data["date"] = _cal.parseDT(date)[0]
             else:
-                data["date"] = datetime.utcfromtimestamp(data["date"])
+                data["date"] = datetime.utcfromtimestamp(date)
         return Document(**data)
 
     @staticmethod
-    def from_json(data: str):
-        return Document.from_dict(json.loads(data))
+    def from_dict_exclude(data: dict, exclude=frozenset(("__id__", "__score__"))):
+        """
+        Create a document from a dict, leaving out the keys in `exclude`.
+        By default, these are the keys that lupyne adds to the dict of a hit.
+        """
+        return Document.from_dict({k: v for k, v in data.items() if k not in exclude})
+
+    @staticmethod
+    def from_json(data: Union[str, bytes]):
+        return Document.from_dict(_json_loads(data))
 
     def to_dict(self):
-        out = object.__getattribute__(self, "fields")
-        if "date" in self.keys():
-            out["date"] = out["date"].timestamp()
-        return out
+        # Return a copy so that the date of the document itself stays a datetime.
+        fields = object.__getattribute__(self, "fields")
+        if isinstance(fields.get("date"), datetime):
+            return {**fields, "date": fields["date"].timestamp()}
+        return dict(fields)
 
     def to_json(self):
         return json.dumps(self.to_dict())
@@ -11,6 +11,7 @@ from pybool_ir.index.index import Indexer, SearcherMixin
 
 import lucene
 from lupyne import engine
+from lupyne.engine.documents import Hits
 
 from pybool_ir.query.generic.parser import DEFAULT_FIELD
 from pybool_ir.util import StopFilter, TypeAsPayloadTokenFilter
@@ -20,6 +21,9 @@ from org.apache.lucene.analysis.en import PorterStemFilter
 
 assert lucene.getVMEnv() or lucene.initVM()
 
+# The only fields that are needed from a hit when the stored fields are not displayed.
+_ID_FIELDS = ("id", "date")
+
 
 class JsonlIndexer(Indexer):
     """
@@ -85,16 +89,22 @@ class GenericSearcher(Indexer, SearcherMixin):
     Generic searcher for any kind of index.
     """
 
-    def search(self, query: str, n_hits=10) -> List[Document]:
+    def _hits(self, query: str, n_hits=10) -> Hits:
+        """
+        Search the index, only loading the stored fields that are actually needed for each hit.
+        When fields are not being displayed, there is no need to marshal every stored field of every hit.
+        """
         hits = self.index.search(query, scores=False, mincount=n_hits)
+        if not self.store_fields:
+            hits.select(*_ID_FIELDS)
+        return hits
+
+    def search(self, query: str, n_hits=10) -> List[Document]:
+        hits = self._hits(query, n_hits)
         if n_hits is None:
             n_hits = len(hits)
         for hit in hits[:n_hits]:
-            if self.store_fields:
-                article: Document = Document.from_dict(hit.dict())  # TODO: automatically calculate field list.
-                yield article
-            else:
-                yield Document.from_dict(hit.dict())
+            yield Document.from_dict(hit.dict())
 
     def process_document(self, doc: Document) -> Document:
         pass
@@ -110,7 +120,7 @@ class GenericSearcher(Indexer, SearcherMixin):
             hit_formatter = "{id} {date} " + "{" + DEFAULT_FIELD + "}\n"
         elif hit_formatter is None:
             hit_formatter = "{id} {date}\n"
-        hits = self.index.search(query, scores=False, mincount=n_hits)
+        hits = self._hits(query, n_hits)
         print(f"hits: {len(hits)}")
         for hit in hits[:n_hits]:
             print("--------------------")
@@ -2,6 +2,7 @@
 Base classes for indexing and searching documents.
 """
 
+import time
 from pathlib import Path
 from typing import List, Iterable, Dict, Callable, Any, Union
 
@@ -10,8 +11,12 @@ from lupyne import engine
 from tqdm.auto import tqdm
 from abc import ABC, abstractmethod
 # noinspection PyUnresolvedReferences
+from java.util import Arrays
+# noinspection PyUnresolvedReferences
 from org.apache.lucene import analysis, index
 # noinspection PyUnresolvedReferences
+from org.apache.lucene.codecs.lucene94 import Lucene94Codec
+# noinspection PyUnresolvedReferences
 from org.apache.lucene.search.similarities import BM25Similarity
 
 from pybool_ir.index.document import Document
@@ -28,7 +33,10 @@ class Indexer(ABC):
     """
 
     def __init__(self, index_path: Union[Path, str], store_fields: bool = True,
-                 store_termvectors: bool = False, optional_fields: List[str] = None):
+                 store_termvectors: bool = False, optional_fields: List[str] = None,
+                 commit_every_docs: int = 1_000_000, commit_every_seconds: float = 60.0,
+                 add_batch_size: int = 1000, best_compression: bool = False,
+                 ram_buffer_mb: float = 256.0, max_buffered_docs: int = -1):
         if not isinstance(index_path, Path):
             index_path = Path(index_path)
         assert isinstance(index_path, Path)
@@ -37,6 +45,18 @@ class Indexer(ABC):
         self.store_fields = store_fields
         self.store_termvectors = store_termvectors
         self.optional_fields = optional_fields
+        # Committing is expensive, so only commit after many documents or after some time has passed.
+        self.commit_every_docs = commit_every_docs
+        self.commit_every_seconds = commit_every_seconds
+        # Documents are added to lucene in batches, so that each call into the JVM adds many documents.
+        self.add_batch_size = add_batch_size
+        # Compressing stored fields harder makes the index noticeably smaller, at a small cost to indexing speed.
+        self.best_compression = best_compression
+        # Lucene flushes a new segment whenever its buffer of added documents fills up. The default buffer (16MB) is small
+        # for bulk indexing and creates many small segments that then need to be merged. A `max_buffered_docs` of -1
+        # means that segments are flushed by RAM usage only.
+        self.ram_buffer_mb = ram_buffer_mb
+        self.max_buffered_docs = max_buffered_docs
 
         self._analyzer = analysis.standard.StandardAnalyzer()
         # See: https://lucene.apache.org/core/9_1_0/core/org/apache/lucene/search/similarities/package-summary.html
@@ -50,21 +70,47 @@ class Indexer(ABC):
 
     def add_document(self, doc: Document, optional_fields: Dict[str, Callable[[Document], Any]] = None) -> None:
         """
-        Add a single document to the index. This method is called by bulk_index.
-
+        Add a single document to the index.
         `optional_fields` is a dictionary of field names to functions that take a document and return a value for that field.
         This is useful for adding fields that are not part of the document, but are derived from the document, calculated at index time.
         """
+        self.index.addDocument(self._lucene_document(doc, optional_fields))
+
+    def _lucene_document(self, doc: Document, optional_fields: Dict[str, Callable[[Document], Any]] = None):
+        """
+        Convert a document into a lucene document, setting any optional fields first.
+        """
         if optional_fields is not None:
             for optional_field_name, optional_field_func in optional_fields.items():
                 doc.set(optional_field_name, optional_field_func(doc))
         try:
-            self.index.add(doc)
+            return self.index.document(doc)
         except Exception as e:
             print("something was wrong with this document:")
             print(doc)
             raise e
 
+    def _add_documents(self, batch: list) -> None:
+        """
+        Add a batch of (document, lucene document) pairs to the index with a single call to `IndexWriter.addDocuments`.
+        If the batch cannot be added, its documents are added one at a time, so that the document at fault is reported.
+        """
+        if not batch:
+            return
+        try:
+            self.index.addDocuments(Arrays.asList([lucene_doc for _, lucene_doc in batch]))
+        except Exception:
+            # None of the documents of a failed batch are kept in the index, so they can all be added again.
+            for doc, lucene_doc in batch:
+                try:
+                    self.index.addDocument(lucene_doc)
+                except Exception as e:
+                    print("something was wrong with this document:")
+                    print(doc)
+                    raise e
+            raise
+        batch.clear()
+
     @abstractmethod
     def process_document(self, doc: Document) -> Document:
         """Get a document ready for indexing."""
@@ -93,12 +139,23 @@ class Indexer(ABC):
 
     def _bulk_index(self, docs: Iterable[Document], total=None, optional_fields: Dict[str, Callable[[Document], Any]] = None) -> None:
         """
-        This is the internal method that actually indexes documents. It will commit the index every 100,000 documents for efficiency.
+        This is the internal method that actually indexes documents.
+        Documents are added to the index in batches of `add_batch_size`.
+        It will commit the index every `commit_every_docs` documents or `commit_every_seconds` seconds, whichever comes first.
         """
-        for i, doc in tqdm(enumerate(docs), desc="indexing progress", position=1, total=total):
-            self.add_document(self.process_document(doc), optional_fields)
-            if i % 100_000 == 0:
+        batch = []
+        last_commit = time.monotonic()
+        # Only check whether to refresh the progress bar every so often, since the loop itself is very cheap.
+        for i, doc in tqdm(enumerate(docs), desc="indexing progress", position=1, total=total, mininterval=1.0, miniters=10_000):
+            doc = self.process_document(doc)
+            batch.append((doc, self._lucene_document(doc, optional_fields)))
+            if len(batch) >= self.add_batch_size:
+                self._add_documents(batch)
+            if (i + 1) % self.commit_every_docs == 0 or time.monotonic() - last_commit > self.commit_every_seconds:
+                self._add_documents(batch)
                 self.index.commit()
+                last_commit = time.monotonic()
+        self._add_documents(batch)
         self.index.commit()
 
     def _set_index_fields(self):
@@ -119,8 +176,19 @@ class Indexer(ABC):
         self.similarity = sim_cls
         self.index.setSimilarity(self.similarity)
 
+    def set_merge_policy(self, merge_policy: index.MergePolicy):
+        """
+        Set the merge policy of the underlying lucene index, e.g., a `TieredMergePolicy` with a larger floor segment size for bulk indexing.
+        """
+        self.index.getConfig().setMergePolicy(merge_policy)
+
     def __enter__(self):
-        self.index = engine.Indexer(directory=str(self.index_path), nrt=True, analyzer=self._analyzer)
+        # The similarity has to be set on the IndexWriterConfig to be used when indexing (e.g., to decide how norms are encoded);
+        # setting it on the indexer below only changes the current searcher.
+        config = {"maxBufferedDocs": self.max_buffered_docs, "RAMBufferSizeMB": self.ram_buffer_mb, "similarity": self.similarity}
+        if self.best_compression:
+            config["codec"] = Lucene94Codec(Lucene94Codec.Mode.BEST_COMPRESSION)
+        self.index = engine.Indexer(directory=str(self.index_path), nrt=True, analyzer=self._analyzer, **config)
         self.index.setSimilarity(self.similarity)
         self._set_index_fields()
         self.set_index_fields(store_fields=self.store_fields)
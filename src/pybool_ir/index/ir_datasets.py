@@ -1,3 +1,4 @@
+from datetime import datetime
 from pathlib import Path
 from typing import Iterable, List, Union
 
@@ -29,11 +30,12 @@ class IRDatasetsIndexer(Indexer):
     # noinspection PyMethodOverriding
     def parse_documents(self) -> (Iterable[Document], int):
         def _doc_iter():
+            epoch = datetime.utcfromtimestamp(0)
             for doc in self.dataset.docs_iter():
                 if isinstance(doc, GenericDoc):
                     d = {
                         "id": doc.doc_id,
-                        "date": 0,
+                        "date": epoch,
                         "contents": doc.text,
                     }
                 else:
@@ -41,9 +43,11 @@ class IRDatasetsIndexer(Indexer):
                     if "id" not in d:
                         d["id"] = doc[0]
                     if "date" not in d:
-                        d["date"] = 0
-                    d["contents"] = [v for v in d.values() if isinstance(v, str)]
-                yield Document.from_dict(d)
+                        d["date"] = epoch
+                    # The string fields of the record itself (not the id or date added above) make up the contents.
+                    d["contents"] = [v for v in doc if isinstance(v, str)]
+                # Only dates that come from the dataset itself need to be parsed.
+                yield Document(**d) if isinstance(d["date"], datetime) else Document.from_dict(d)
 
         return _doc_iter(), self.dataset.docs_count()
 
@@ -2,28 +2,41 @@
 Off-the-shelf indexer for PubMed articles.
 """
 
-import calendar
-import gzip
+import multiprocessing
 import os
-import xml.etree.ElementTree as et
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple, Iterable
-from xml.etree.ElementTree import Element
+from typing import List, Iterable, Union
 
 import lucene
+from lxml.etree import _Element as Element
 from lupyne import engine
 from lupyne.engine.documents import Hit
+# noinspection PyUnresolvedReferences
+from org.apache.lucene import document
+# noinspection PyUnresolvedReferences
+from org.apache.lucene.search.similarities import BooleanSimilarity
 from tqdm.auto import tqdm
 
+# The XML parsing and date handling are kept in a module without lucene, for the worker processes of read_folder_parallel.
+# noinspection PyUnresolvedReferences
+from pybool_ir.index._pubmed_xml import DEFAULT_YEAR, DEFAULT_MONTH, DEFAULT_DAY, parse_medline_date, \
+    parse_pubmed_article_fields, read_file_fields, _read_file_fields
 from pybool_ir.index.document import Document
 from pybool_ir.index.index import Indexer, SearcherMixin
 
 assert lucene.getVMEnv() or lucene.initVM()
 
-DEFAULT_YEAR = 1900
-DEFAULT_MONTH = 1
-DEFAULT_DAY = 1
+#: Multi-valued fields of PubMed articles, which must be retrieved from a hit as lists.
+_LIST_FIELDS = ("mesh_heading_list",
+                "mesh_qualifier_list",
+                "mesh_major_heading_list",
+                "supplementary_concept_list",
+                "keyword_list",
+                "publication_type")
 
 
 class PubmedArticle(Document):
@@ -54,318 +67,27 @@ class PubmedArticle(Document):
         Create a PubmedArticle from a lucene Hit. This method also removes the `__id__` and `__score__` fields from the hit.
         A document prior to indexing should be equivalent to a document retrieved from a hit using this method.
         """
-        d = hit.dict("mesh_heading_list",
-                     "mesh_qualifier_list",
-                     "mesh_major_heading_list",
-                     "keyword_list",
-                     "publication_type",
-                     "supplementary_concept_list")
-        del d["__id__"]
-        del d["__score__"]
-        return PubmedArticle.from_dict(d)
-
-
-_possible_days = {"1st": "1", "2nd": "2", "3rd": "3"}
-for _i in range(31):
-    str_i = str(_i)
-    _possible_days[f"{_i}th"] = str_i
-
-
-def _day_str_to_day(day_str: str) -> Tuple[str, bool]:
-    if day_str.isdigit():
-        return day_str, True
-    if day_str in _possible_days:
-        return _possible_days[day_str], True
-    return day_str, False
-
-
-# Journals vary in the way the publication date appears on an issue.
-# Some journals include just the year, whereas others include the year
-# plus month or year plus month plus day. And, some journals use the
-# year and season (e.g., Winter 1997). The publication date in the
-# citation is recorded as it appears in the journal.
-_months = {
-    # Short English months.
-    "jan": 1,
-    "feb": 2,
-    "mar": 3,
-    "apr": 4,
-    "may": 5,
-    "jun": 6,
-    "jul": 7,
-    "aug": 8,
-    "sep": 9,
-    "oct": 10,
-    "nov": 11,
-    "dec": 12,
-    "set": 9,
-    # Full English months.
-    "january": 1,
-    "february": 2,
-    "march": 3,
-    "april": 4,
-    "june": 6,
-    "july": 7,
-    "august": 8,
-    "september": 9,
-    "october": 10,
-    "november": 11,
-    "december": 12,
-    # Full German month names.
-    "januar": 1,
-    "februar": 2,
-    "marz": 3,
-    "märz": 3,
-    "mai": 5,
-    "juni": 6,
-    "juli": 7,
-    "oktober": 10,
-    "dezember": 12,
-    # Unknown language month names.
-    "desember": 12,  # Indonesian?
-}
-
-# Dates with a season are set as:
-# winter = January, spring = April, summer = July and fall = October.
-_seasons = {"winter": 1,
-            "spring": 4,
-            "summer": 7,
-            "fall": 10,
-            "autumn": 10,
-            "aut": 10,
-            "[season]": 1}
-
-# There is no "official" documentation for how these dates are interpreted.
-# So let's just use the same dates as the seasons as a pretty good guess.
-_quarters = {
-    "1st quarter": 1,
-    "2nd quarter": 4,
-    "3rd quarter": 7,
-    "4th quarter": 10,
-    "first quarter": 1,
-    "second quarter": 4,
-    "third quarter": 7,
-    "fourth quarter": 10,
-}
-
-_possible_months = {**_months, **_seasons, **_quarters}
-
-
-def _month_str_to_month(month_str: str, fail_on_nonparseable_str: bool = False) -> int:
-    # Strange months that fail to parse
-    # metaboliche -> ?
-    # easter -> ?
-    # trimest -> ?
-    # qctober -> misspelling of October.
-    # oktober -> German for October.
-    # suppl -> ?
-    # abr -> ?
-    # aig -> ?
-    # ago -> ?
-    # aut -> Autumn (?)
-    # dic -> ?
-    # mai -> German for May (?)
-    # mac -> ?
-    # noc -> ?
-    # oc -> ?
-    # t -> ?
-    # c -> ?
-
-    # If we have a digit, just return it and assume month.
-    if month_str.isdigit():
-        return int(month_str)
-
-    # Otherwise, first we need to make the string lower case.
-    month_str = month_str.lower()
-
-    # Publication dates without a month are set to January, multiple
-    # months (e.g., Oct-Dec) are set to the first month.
-    if "-" in month_str:
-        parts = month_str.split("-")
-        month_str = parts[0]
-    elif "/" in month_str:
-        parts = month_str.split("/")
-        month_str = parts[0]
-
-    if month_str.isdigit():
-        return int(month_str)
-
-    if month_str in _possible_months:
-        return _possible_months[month_str]
-
-    for k, v in _possible_months.items():
-        if k in month_str:
-            return int(v)
-
-    # We may wish to gracefully fail, but if not,
-    # just assume the month string is garbage and
-    # by default return January as the month.
-    err = f"{month_str} is not a parseable string"
-    if fail_on_nonparseable_str:
-        raise KeyError(err)
-    else:
-        print(err)
-        return 1
-
-
-def parse_medline_date(date_str: str) -> Tuple[int, int, int]:
-    """
-    Parse a date string from a Medline record. The returned value is a tuple of (year, month, day).
-
-    The following is a needlessly complicated, yet accurate implementation
-    of how Pubmed handles the publication date of documents.
-    For more information about the nuances of this technical marvel, see:
-    https://pubmed.ncbi.nlm.nih.gov/help/#dp
-    """
-    day = str(DEFAULT_DAY)
-    month = str(DEFAULT_MONTH)
-    year = str(DEFAULT_YEAR)
-    date_str = date_str.lower(). \
-        replace(".", ""). \
-        replace(",", ""). \
-        replace(" to ", "-"). \
-        replace(" & ", "-")
-    dur_parts = date_str.split("-")
-    # Now that we have the LHS of the duration,
-    # let's parse it like normal.
-    if len(dur_parts) > 1:
-        date_str = dur_parts[0]
-
-    # We now have to split the string and run some
-    # tests to determine what the parts of the date are.
-    date_parts = date_str.split()
-
-    if len(date_parts) == 1:  # Likely we are looking at a year.
-        if date_parts[0].isdigit():  # Almost certainly a year.
-            year = date_parts[0]
-        else:  # If not, it almost certainly is a month.
-            month = date_parts[0]
-
-    elif len(date_parts) == 2:  # Almost certainly a year and a month.
-        year, month = date_parts
-    elif len(date_parts) >= 3:  # Almost certainly a year-month-day combination.
-        year, month, day = date_parts[:3]
-        # Oops, some dates look like `2021 4th Quarter`,
-        # so we need to do a switch-a-roo.
-        if day.lower() == "quarter":
-            month = f"{month} {day}"
-            day = "1"
-    else:
-        raise Exception(f"{date_str} is unparseable\nguru meditation: {date_parts}")
-
-    # For the case that the date is something like `Fall 2021`
-    # instead of the more typical `2021 Fall`:
-    if not year.isdigit():
-        year, month = month, year
-
-    # Let's find out if the day could be a day.
-    day, is_day = _day_str_to_day(day)
-    if not is_day:  # Hmm, maybe the day isn't a day.
-        # Therefore, the day is likely a month!
-        day, month = month, day
-        day, _ = _day_str_to_day(day)
-
-    # Hail Mary at this point, who knows what the day is!
-    if not day.isdigit():
-        day = str(DEFAULT_DAY)
-
-    # Now we can convert the parts to ints for our proper datetime object.
-    year = int(year) if year is not None else DEFAULT_YEAR
-    month = _month_str_to_month(month) if month is not None else DEFAULT_MONTH  # Special parsing for months.
-    day = int(day) if day is not None else DEFAULT_DAY
-    return year, month, day
+        return PubmedArticle.from_dict_exclude(hit.dict(*_LIST_FIELDS))
 
 
 def parse_pubmed_article_node(element: Element) -> PubmedArticle:
     """
     Parse a PubmedArticle node from a Pubmed XML element.
     """
-    pmid = element.find("MedlineCitation/PMID").text
-    article_date: datetime
-    journal_date_element = element.find(
-        "MedlineCitation/Article/Journal/JournalIssue/PubDate"
-    )
-    medline_date: Element
-    if journal_date_element is not None:
-        medline_date = journal_date_element.find("MedlineDate")
-        if medline_date is not None:
-            year, month, day = parse_medline_date(medline_date.text)
-        else:
-            year = journal_date_element.find("Year")
-            month = journal_date_element.find("Month") or journal_date_element.find("Season")
-            day = journal_date_element.find("Day")
-
-            year = int(year.text) if year is not None else DEFAULT_YEAR
-            month = _month_str_to_month(month.text) if month is not None else DEFAULT_MONTH
-            day = int(day.text) if day is not None else DEFAULT_DAY
-
-        # Okay, *finally* we have integer representations.
-        # First, the month could be less than 1. (!?)
-        if month < 1:
-            month = DEFAULT_MONTH
+    return PubmedArticle(**parse_pubmed_article_fields(element))
 
-        # If the "month" is >12, likely the day and month need switching.
-        if month > 12:
-            month, day = day, month
 
-        # If for some reason, the day exceeds the number of days
-        # in a specific month, then just reset the day to the first.
-        ndays = calendar.mdays[month] + (month == calendar.February and calendar.isleap(year))
-        if day > ndays:
-            day = DEFAULT_DAY
-
-        if year < 1700:
-            year = DEFAULT_YEAR
+class _PmidField(engine.Field):
+    """
+    Field for PMIDs. The PMID is indexed and stored as a string, so that it can still be searched with term queries,
+    but it is also added as a numeric point and numeric doc values, which are much more compact than string doc values.
+    """
 
-        article_date = datetime(year=year, month=month, day=day)
-    else:
-        raise Exception("no journal date element found")
-    abstract_el = element.findall("MedlineCitation/Article/Abstract/AbstractText")
-    chemical_list_el = element.findall("MedlineCitation/ChemicalList/Chemical/NameOfSubstance")
-    suppl_mesh_list_el = element.findall("MedlineCitation/SupplMeshList/SupplMeshName")
-    return PubmedArticle(
-        id=pmid,
-        date=article_date,
-        # date_revised=field_data.YES if article_revised_element is not None else field_data.NO,
-        title="".join(element.find("MedlineCitation/Article/ArticleTitle").itertext()),
-        abstract=" ".join(["".join(x.itertext()) for x in abstract_el]) if abstract_el is not None else "",
-        publication_type=[
-            el.text
-            for el in element.findall(
-                "MedlineCitation/Article/PublicationTypeList/PublicationType"
-            )
-        ],
-        mesh_heading_list=[
-            el.text
-            for el in element.findall(
-                "MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName"
-            )
-        ],
-        mesh_major_heading_list=[
-            el.text
-            for el in element.findall(
-                "MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName[@MajorTopicYN='Y']"
-            )
-        ],
-        mesh_qualifier_list=[
-            el.text
-            for el in element.findall(
-                "MedlineCitation/MeshHeadingList/MeshHeading/QualifierName"
-            )
-        ],
-        supplementary_concept_list=[
-                                       el.text
-                                       for el in chemical_list_el
-                                       if chemical_list_el is not None
-                                   ] + [
-                                       el.text
-                                       for el in suppl_mesh_list_el
-                                       if suppl_mesh_list_el is not None
-                                   ],
-        keyword_list=[
-            el.text for el in element.findall("MedlineCitation/KeywordList/Keyword")
-        ],
-    )
+    def items(self, *values):
+        for value in values:
+            yield document.LongPoint(self.name, int(value))
+            yield document.NumericDocValuesField(self.name, int(value))
+        yield from super().items(*values)
 
 
 class PubmedIndexer(Indexer, SearcherMixin):
@@ -379,21 +101,24 @@ class PubmedIndexer(Indexer, SearcherMixin):
 
     """
 
+    def __init__(self, index_path: Union[Path, str], store_fields: bool = True, store_termvectors: bool = False,
+                 optional_fields: List[str] = None, workers: int = 1, **kwargs):
+        # Stored fields (titles and abstracts) make up most of a PubMed index, so compress them as much as possible.
+        kwargs.setdefault("best_compression", True)
+        super().__init__(index_path, store_fields, store_termvectors, optional_fields, **kwargs)
+        #: The number of processes used to parse XML files when indexing a folder.
+        self.workers = workers
+        # PubMed searches are boolean, so documents are not ranked and there is no need to compute norms.
+        self.similarity = BooleanSimilarity()
+
     @staticmethod
     def read_file(fname: Path) -> Iterable[Document]:
         """
         Read a single file, yielding documents. Supports both XML and GZipped XML files. This is how PubMed documents are stored on the baseline FTP server.
+        The file is parsed incrementally, so only the article currently being parsed is kept in memory.
         """
-        if str(fname).endswith(".gz"):
-            with gzip.open(fname, "rb") as f:
-                root = et.fromstring(f.read())
-        elif str(fname).endswith(".xml"):
-            tree = et.parse(fname)
-            root = tree.getroot()
-        else:
-            raise Exception("file type not supported by parser")
-        for pubmed_article in root.iter("PubmedArticle"):
-            yield parse_pubmed_article_node(pubmed_article)
+        for fields in read_file_fields(fname):
+            yield PubmedArticle(**fields)
 
     @staticmethod
     def read_folder(folder: Path) -> Iterable[Document]:
@@ -406,6 +131,27 @@ class PubmedIndexer(Indexer, SearcherMixin):
             for article in PubmedIndexer.read_file(folder / file):
                 yield article
 
+    @staticmethod
+    def read_folder_parallel(folder: Path, workers: int = os.cpu_count()) -> Iterable[Document]:
+        """
+        Read a folder of XML files, parsing several files at once in a pool of processes.
+        Articles are yielded in the same order as `read_folder`, and only a few files are parsed ahead of the consumer.
+        """
+        valid_files = [folder / f for f in os.listdir(str(folder)) if not f.startswith(".")]
+        remaining_files = iter(valid_files)
+        pbar = tqdm(desc="folder progress", total=len(valid_files), position=0)
+        # Forking a process that is running the JVM is not safe, so the workers are spawned instead.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = deque(executor.submit(_read_file_fields, f) for f in islice(remaining_files, workers * 2))
+            while pending:
+                articles = pending.popleft().result()
+                for f in islice(remaining_files, 1):
+                    pending.append(executor.submit(_read_file_fields, f))
+                pbar.update()
+                for fields in articles:
+                    yield PubmedArticle(**fields)
+        pbar.close()
+
     @staticmethod
     def read_jsonl(file: Path) -> Iterable[Document]:
         """
@@ -413,13 +159,16 @@ class PubmedIndexer(Indexer, SearcherMixin):
         The pybool_ir command line tool can be used to convert PubMed XML files to JSONL files.
         Conversion of the files makes indexing considerably faster since the XML files do not need to be parsed.
         """
-        with open(file, "r") as f:
+        # Lines are read as bytes, which the JSON parser can decode itself.
+        with open(file, "rb") as f:
             for line in f:
                 yield PubmedArticle.from_json(line)
 
     def parse_documents(self, baseline_path: Path) -> (Iterable[Document], int):
         total = None
-        if baseline_path.is_dir():
+        if baseline_path.is_dir() and self.workers > 1:
+            articles = self.read_folder_parallel(baseline_path, self.workers)
+        elif baseline_path.is_dir():
             articles = self.read_folder(baseline_path)
         else:
             with open(baseline_path) as f:
@@ -434,36 +183,18 @@ class PubmedIndexer(Indexer, SearcherMixin):
         if doc.title is None:
             doc.title = ""
 
-        # Filter nulls.
-        doc.keyword_list = list(filter(None, doc.keyword_list))
-        doc.mesh_heading_list = list(filter(None, doc.mesh_heading_list))
-        doc.mesh_major_heading_list = list(filter(None, doc.mesh_major_heading_list))
-        doc.mesh_qualifier_list = list(filter(None, doc.mesh_qualifier_list))
-        doc.supplementary_concept_list = list(filter(None, doc.supplementary_concept_list))
-        doc.publication_type = list(filter(None, doc.publication_type))
-
-        # Ensure there are lists and not nulls.
-        if doc.keyword_list is None or not all(doc.keyword_list):
-            doc.keyword_list = []
-        if doc.mesh_heading_list is None or not all(doc.mesh_heading_list):
-            doc.mesh_heading_list = []
-        if doc.mesh_major_heading_list is None or not all(doc.mesh_major_heading_list):
-            doc.mesh_major_heading_list = []
-        if doc.mesh_qualifier_list is None or not all(doc.mesh_qualifier_list):
-            doc.mesh_qualifier_list = []
-        if doc.supplementary_concept_list is None or not all(doc.supplementary_concept_list):
-            doc.supplementary_concept_list = []
-        if doc.publication_type is None or not all(doc.publication_type):
-            doc.publication_type = []
+        # Filter nulls, and ensure there are lists and not nulls.
+        for field in _LIST_FIELDS:
+            doc.set(field, [x for x in doc[field] or () if x])
 
         return doc
 
     def set_index_fields(self, store_fields: bool = False, optional_fields: List[str] = None):
-        self.index.set("id", engine.Field.String, stored=True, docValuesType="sorted")  # PMID
+        self.index.set("id", _PmidField.String, stored=True)  # PMID
         self.index.set("date", engine.DateTimeField, stored=store_fields)  # Date that the PMID was actually published.
-        self.index.set("title", engine.Field.Text, stored=store_fields)
-        self.index.set("abstract", engine.Field.Text, stored=store_fields)
-        self.index.set("keyword_list", engine.Field.Text, stored=store_fields)
+        self.index.set("title", engine.Field.Text, stored=store_fields, omitNorms=True)
+        self.index.set("abstract", engine.Field.Text, stored=store_fields, omitNorms=True)
+        self.index.set("keyword_list", engine.Field.Text, stored=store_fields, omitNorms=True)
         self.index.set("publication_type", engine.Field.String, stored=store_fields)
         self.index.set("mesh_heading_list", engine.Field.String, stored=store_fields)
         self.index.set("mesh_qualifier_list", engine.Field.String, stored=store_fields)
@@ -476,12 +207,7 @@ class PubmedIndexer(Indexer, SearcherMixin):
             n_hits = len(hits)
         for hit in hits[:n_hits]:
             if self.store_fields:
-                article: PubmedArticle = PubmedArticle.from_dict(hit.dict("mesh_heading_list",
-                                                                          "mesh_qualifier_list",
-                                                                          "mesh_major_heading_list",
-                                                                          "supplementary_concept_list",
-                                                                          "keyword_list",
-                                                                          "publication_type"))
+                article: PubmedArticle = PubmedArticle.from_dict(hit.dict(*_LIST_FIELDS))
                 yield article
             else:
                 yield PubmedArticle.from_dict(hit.dict())
@@ -495,12 +221,7 @@ class PubmedIndexer(Indexer, SearcherMixin):
         print(f"hits: {len(hits)}")
         for hit in hits[:n_hits]:
             if self.store_fields:
-                article: PubmedArticle = PubmedArticle.from_dict(hit.dict("mesh_heading_list",
-                                                                          "mesh_qualifier_list",
-                                                                          "mesh_major_heading_list",
-                                                                          "supplementary_concept_list",
-                                                                          "keyword_list",
-                                                                          "publication_type"))
+                article: PubmedArticle = PubmedArticle.from_dict(hit.dict(*_LIST_FIELDS))
                 print(hit_formatter.format(id=article.id,
                                            title=article.title,
                                            date=article.date,
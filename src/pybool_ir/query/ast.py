@@ -7,36 +7,50 @@ The `AtomNode` class represents a query that is a single query. It can be used t
 """
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple, Union
 
 
 class ASTNode:
-    pass
+    __slots__ = ()
 
+    # Frozen nodes cannot be unpickled by setting their attributes, so the slots are saved and restored directly.
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
 
-@dataclass
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+# Nodes are immutable (and so hashable), and use slots rather than a __dict__, since queries can have many nodes.
+# The slots are written out by hand, since dataclass(slots=True) needs Python 3.10.
+@dataclass(frozen=True)
 class OperatorNode(ASTNode):
     """
     Represents a query that is a combination of other queries.
     """
+    __slots__ = ("operator", "children")
+
     #: The relationship expressed between the children, e.g., AND, OR, NOT.
     operator: str
     #: The children of the node.
-    children: List[ASTNode]
+    children: Tuple[ASTNode, ...]
 
     def __repr__(self):
-        return f"({f' {self.operator.upper()} '.join([str(x) for x in self.children])})"
+        return f"({f' {self.operator.upper()} '.join(map(str, self.children))})"
 
 
-@dataclass
+@dataclass(frozen=True)
 class AtomNode(ASTNode):
     """
     Represents a query that is a single query.
     """
+    __slots__ = ("query", "field")
+
     #: The actual string of the query.
     query: str
     #: The field or fields that the query is applied to in the index.
-    field: List[str] | str  # TODO: field weighting?
+    field: Union[List[str], str]  # TODO: field weighting?
 
     def __str__(self):
         return self.__repr__()
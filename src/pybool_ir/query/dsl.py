@@ -16,6 +16,9 @@ op_not = "not"
 
 
 class QueryObject(ABC):
+    # Queries can have many atoms, so query objects use slots rather than a __dict__ each.
+    __slots__ = ()
+
     @abstractmethod
     def eval(self):
         raise NotImplementedError()
@@ -42,7 +45,9 @@ class QueryObject(ABC):
 
     def replace(self, other):
         assert isinstance(other, QueryObject), "Can only replace with another QueryObject."
-        self.__dict__.update(other.__dict__)
+        for cls in type(other).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                setattr(self, slot, getattr(other, slot))
         return self
 
     @abstractmethod
@@ -51,6 +56,8 @@ class QueryObject(ABC):
 
 
 class AtomicQueryObject(QueryObject, ABC):
+    __slots__ = ("query", "field")
+
     def __init__(self, query: str = None, field=default_field):
         self.query = query
         self.field = field
@@ -69,11 +76,19 @@ class AtomicQueryObject(QueryObject, ABC):
 
 
 class Term(AtomicQueryObject):
+    __slots__ = ()
 
     def __init__(self, term: str = None, field=default_field):
         assert term is None or " " not in term, "Term cannot contain spaces."
         super().__init__(term, field)
 
+    @classmethod
+    def _unchecked(cls, term: str, field=default_field):
+        # For callers that have already checked that the term has no spaces.
+        obj = cls.__new__(cls)
+        AtomicQueryObject.__init__(obj, term, field)
+        return obj
+
     def eval(self):
         return Q.term(self.field, self.query)
 
@@ -82,6 +97,7 @@ class Term(AtomicQueryObject):
 
 
 class Phrase(AtomicQueryObject):
+    __slots__ = ()
 
     def __init__(self, phrase: str, field=default_field):
         super().__init__(query=phrase, field=field)
@@ -96,17 +112,23 @@ class Phrase(AtomicQueryObject):
 def auto(query: str, field: str = default_field):
     if " " in query:
         return Phrase(query, field)
-    return Term(query, field)
+    return Term._unchecked(query, field)
 
 
 class Op(QueryObject):
+    __slots__ = ("_op", "children")
+
     def __init__(self, op: str, *args: Union[str, QueryObject]):
         self._op = op.lower()
         self.children = []
         for arg in args:
             if isinstance(arg, str):
                 arg = auto(arg)
-            self.children.append(arg)
+            # AND and OR are associative, so nested operators of the same kind can be flattened into this one.
+            if isinstance(arg, Op) and arg._op == self._op and self._op in (op_and, op_or):
+                self.children.extend(arg.children)
+            else:
+                self.children.append(arg)
 
     def __repr__(self):
         return f"{self._op}({', '.join([str(c) for c in self.children])})"
@@ -124,9 +146,16 @@ class Op(QueryObject):
         raise NotImplementedError()
 
     def accept(self, visitor):
-        visitor.visit(self)
-        for child in self.children:
-            child.accept(visitor)
+        # Walk the query with a stack rather than recursion, since queries can be very deeply nested.
+        # Children are pushed in reverse so that they are still visited in order (pre-order).
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Op):
+                visitor.visit(node)
+                stack.extend(reversed(node.children))
+            else:
+                node.accept(visitor)
 
 
 class QueryVisitor(ABC):
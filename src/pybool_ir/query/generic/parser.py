@@ -2,8 +2,10 @@
 Generic query parser that can be used to parse queries into an AST and then into a Lucene query.
 """
 
+import sys
 from abc import abstractmethod
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 import lucene
 from lupyne import engine
@@ -17,7 +19,7 @@ from pyparsing import (
     Forward,
     ParserElement, Literal, Combine, PrecededBy, Group, Suppress, Optional, infix_notation, OpAssoc, CaselessKeyword, Keyword, OneOrMore, White)
 
-from pybool_ir.query.parser import MAX_CLAUSES
+from pybool_ir.query.parser import MAX_CLAUSES, PACKRAT_CACHE_SIZE
 from pybool_ir.query.ast import AtomNode, ASTNode, OperatorNode
 from pybool_ir.query.parser import QueryParser
 from pybool_ir.query.units import QueryAtom
@@ -31,7 +33,14 @@ Q = engine.Query
 search.BooleanQuery.setMaxClauseCount(MAX_CLAUSES)  # There is apparently a cap for efficiency reasons.
 
 # Makes parsing faster. (?)
-ParserElement.enablePackrat()
+ParserElement.enablePackrat(cache_size_limit=PACKRAT_CACHE_SIZE)
+
+# Characters that are removed from queries before they are parsed.
+_STRIP_CHARS_TABLE = str.maketrans("", "", ".-/,?*'")
+
+# Boolean operators. These are shared by the grammar of every parser, rather than created for each one.
+# Operators must be written in upper case (e.g., "a AND b"), since Keyword is faster to match than CaselessKeyword.
+_AND, _OR, _NOT = map(Keyword, "AND OR NOT".split())
 
 
 class ParseNode(object):
@@ -43,44 +52,99 @@ class ParseNode(object):
     def __ast__(self):
         raise NotImplementedError()
 
+    @abstractmethod
+    def __build__(self):
+        """Create both the AST object and the Lucene query in a single walk of the parse tree."""
+        raise NotImplementedError()
+
+
+@lru_cache(maxsize=50_000)
+def _stem_tokens(text: str) -> tuple:
+    return tuple(token.charTerm for token in Atom.stemmer.tokens(text))
+
+
+# Lucene queries are immutable, so the same term query can be used by every atom that needs it.
+_term_query = lru_cache(maxsize=50_000)(Q.term)
+
 
 class Atom(ParseNode):
+    # Both of these are shared by all atoms, rather than created for every atom that is parsed.
+    # Analyzers do not keep any state between calls to tokens(), so one can be reused.
+    default_stop_set = frozenset(["but", "be", "with", "such", "then", "for", "no", "will", "not", "are", "and", "their", "if", "this", "on", "into", "a", "or", "there", "in", "that", "they", "was", "is", "it", "an", "the", "as", "at", "these", "by", "to", "of"])
+    stemmer = engine.Analyzer.standard(StopFilter, PorterStemFilter, TypeAsPayloadTokenFilter)
+
     def __init__(self, tokens):
         self.unit: QueryAtom = tokens[0][0]
-        self.default_stop_set = ["but", "be", "with", "such", "then", "for", "no", "will", "not", "are", "and", "their", "if", "this", "on", "into", "a", "or", "there", "in", "that", "they", "was", "is", "it", "an", "the", "as", "at", "these", "by", "to", "of"]
-        self.field = tokens[0][1] if len(tokens[0]) > 1 else DEFAULT_FIELD
-        self.stemmer = engine.Analyzer.standard(StopFilter, PorterStemFilter, TypeAsPayloadTokenFilter)
+        # Field names repeat across atoms, so share a single string for each.
+        self.field = sys.intern(tokens[0][1]) if len(tokens[0]) > 1 else DEFAULT_FIELD
 
     def __query__(self):
-        if self.unit.quoted and len(self.unit.analyzed_query.split()) > 1:
+        if self.unit.quoted and len(self.unit.analyzed_tokens) > 1:
             return Q.any(*[Q.regexp(self.field, self.unit.query)])
         else:
-            return Q.any(*[Q.term(self.field, x) for x in [token.charTerm for token in self.stemmer.tokens(self.unit.analyzed_query)]])
+            return Q.any(*[_term_query(self.field, x) for x in _stem_tokens(self.unit.analyzed_query)])
 
     def __ast__(self):
         return AtomNode(query=self.unit.raw_query, field=self.field)
 
+    def __build__(self):
+        return self.__ast__(), self.__query__()
+
     def __repr__(self):
         return f"{self.unit}[{self.field}]"
 
 
 class OpNode:
     def __init__(self, tokens):
-        self.operator = tokens[0][1]
-        self.operands = tokens[0][::2]
+        # Operators and operands alternate, e.g., [a, OR, b, OR, c].
+        toks = tokens[0]
+        self.operator = toks[1]
+        self.operands = toks[::2]
 
     def __repr__(self):
         return "({}<{}>:{!r})".format(self.__class__.__name__,
                                       self.operator, self.operands)
 
+    def _fold(self, leaf, combine):
+        # Walk the operands iteratively (in post-order), since boolean queries can be very deeply nested.
+        # `leaf` is called on each atom, and `combine` on each operator with the results of its operands.
+        built = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, OpNode):
+                built[id(node)] = leaf(node)
+            elif expanded:
+                built[id(node)] = combine(node, [built[id(child)] for child in node.operands])
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.operands)
+        return built[id(self)]
+
     def __ast__(self):
-        return OperatorNode(operator=self.operator, children=[node.__ast__() for node in self.operands])
+        return self._fold(lambda atom: atom.__ast__(),
+                          lambda node, children: OperatorNode(operator=node.operator, children=tuple(children)))
+
+    def __query__(self):
+        return self._fold(lambda atom: atom.__query__(),
+                          lambda node, queries: node._combine(queries))
+
+    def __build__(self):
+        def combine(node, built):
+            children, queries = zip(*built)
+            return OperatorNode(operator=node.operator, children=children), node._combine(queries)
+
+        return self._fold(lambda atom: atom.__build__(), combine)
+
+    @abstractmethod
+    def _combine(self, queries):
+        """Combine the Lucene queries of the operands."""
+        raise NotImplementedError()
 
 
 class NotOp(OpNode, ParseNode):
-    def __query__(self):
-        lhs = self.operands[0].__query__()
-        rhs = self.operands[1].__query__()
+    def _combine(self, queries):
+        lhs, rhs = queries[0], queries[1]
         builder = search.BooleanQuery.Builder()
         builder.add(lhs, search.BooleanClause.Occur.SHOULD)
         builder.add(rhs, search.BooleanClause.Occur.MUST_NOT)
@@ -88,16 +152,17 @@ class NotOp(OpNode, ParseNode):
 
 
 class BinOp(OpNode, ParseNode):
-    def __query__(self):
-        if self.operator == "AND":
-            op = Q.all
-        else:
-            op = Q.any
-        return op(*[operand.__query__() for operand in self.operands])
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        # Choose how to combine the operands once, when the query is parsed, rather than every time it is evaluated.
+        self._op = Q.all if self.operator == "AND" else Q.any
+
+    def _combine(self, queries):
+        return self._op(*queries)
 
 
 class UnsupportedOp(OpNode, ParseNode):
-    def __query__(self):
+    def _combine(self, queries):
         raise Exception("This query uses a Boolean operator that is not supported in Lucene")
 
 
@@ -110,44 +175,51 @@ class GenericQueryParser(QueryParser):
         if additional_operators is None:
             additional_operators = []
         self.additional_operators = additional_operators
+        # The grammar only depends on the operators, so it is only built once.
+        self._expression = self._grammar()
+        # The same queries are often parsed many times (e.g., once for the AST and again for lucene).
+        self._parse_cached = lru_cache(maxsize=1024)(self.parse)
 
     def parse_ast(self, raw_query: str) -> ASTNode:
-        return self.parse(raw_query).__ast__()
+        return self._parse_cached(raw_query).__ast__()
 
     def parse_lucene(self, raw_query: str) -> Q:
         try:
-            return self.parse(raw_query).__query__()
+            return self._parse_cached(raw_query).__query__()
         except Exception as e:
             print(raw_query)
             raise e
 
-    def parse(self, raw_query: str) -> ParseNode:
-        raw_query = raw_query.translate(str.maketrans("", "", ".-/,?*'"))
+    def parse_both(self, raw_query: str) -> Tuple[ASTNode, Q]:
+        try:
+            return self._parse_cached(raw_query).__build__()
+        except Exception as e:
+            print(raw_query)
+            raise e
 
+    def _grammar(self) -> Forward:
         expression = Forward()
 
-        # Boolean operators.
-        AND, OR, NOT = map(
-            Keyword, "AND OR NOT".split()
-        )
-
         _valid_phrase = (~PrecededBy(Literal("*")) & (Word(alphanums + " ") ^ Literal("*")))
         phrase = Combine(Literal('"') + _valid_phrase + Literal('"')).set_parse_action(QueryAtom)
-        quoteless_phrase = (Combine(OneOrMore(_valid_phrase | White(" ", max=1) + ~(White() | AND | OR | NOT)))).set_parse_action(QueryAtom)
+        quoteless_phrase = (Combine(OneOrMore(_valid_phrase | White(" ", max=1) + ~(White() | _AND | _OR | _NOT)))).set_parse_action(QueryAtom)
 
         field_restriction = (Suppress(":") + Word(alphanums + "_."))
 
         atom = Group((quoteless_phrase | phrase) + Optional(field_restriction)).set_parse_action(Atom)
-        operators = [(NOT, 2, OpAssoc.RIGHT, NotOp), (OR, 2, OpAssoc.LEFT, BinOp), (AND, 2, OpAssoc.LEFT, BinOp)] + \
+        operators = [(_NOT, 2, OpAssoc.RIGHT, NotOp), (_OR, 2, OpAssoc.LEFT, BinOp), (_AND, 2, OpAssoc.LEFT, BinOp)] + \
                     [(CaselessKeyword(x), 2, OpAssoc.LEFT, UnsupportedOp) for x in self.additional_operators]
         expression << infix_notation(atom, operators)
+        return expression
+
+    def parse(self, raw_query: str) -> ParseNode:
+        raw_query = raw_query.translate(_STRIP_CHARS_TABLE)
 
         try:
-            expression.scan_string(raw_query, debug=True)
+            return self._expression.parse_string(raw_query, parse_all=True)[0]
         except Exception as e:
             print(raw_query)
             raise e
-        return expression.parse_string(raw_query, parse_all=True)[0]
 
     def format(self, node: ASTNode) -> str:
         """
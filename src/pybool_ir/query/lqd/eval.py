@@ -1,19 +1,57 @@
+from operator import itemgetter
 from pathlib import Path
-from typing import Union, Iterable, List
+from typing import Union, Iterable, List, Dict
 
 import pandas as pd
+# noinspection PyUnresolvedReferences
+from java.util.concurrent import Executors
+from lupyne.engine.documents import Hits
+# noinspection PyUnresolvedReferences
+from org.apache.lucene import search
 
 from pybool_ir.index import Indexer
 from pybool_ir.index.document import Document
 from pybool_ir.query.lqd import lqd_parse
-from pybool_ir.query.lqd.parser import MetaFn, Value, LqdList, LqdDict, LqdInt
+from pybool_ir.query.lqd.parser import MetaFn, Value, LqdList, LqdDict, LqdInt, OPCODES, TAG_META_FN, TAG_VALUE
 from pybool_ir.query.units import Q
 
 
 class Environment(Indexer):
-    def __init__(self, index_path: Union[Path, str]):
+    def __init__(self, index_path: Union[Path, str], search_threads: int = 4):
         super().__init__(index_path)
         self.stack: List[Value] = []
+        # The index is only read, so documents that have been looked up once can be reused (doc id -> document).
+        self._doc_cache: Dict[str, LqdDict] = {}
+        # The number of threads used to search the segments of the index in parallel (for .docs).
+        self.search_threads = search_threads
+        self._executor = None
+        self._searcher = None
+        self._concurrent_searcher = None
+
+    def __enter__(self):
+        super().__enter__()
+        self._open_searchers()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._executor is not None:
+            self._executor.shutdown()
+        super().__exit__(exc_type, exc_val, exc_tb)
+
+    def _open_searchers(self):
+        # The index is only read, so the same searcher is used for every query until it is reloaded (.reload).
+        self._searcher = self.index.indexSearcher
+        self._concurrent_searcher = None
+        # Searching segments in parallel only pays off when there is more than one segment.
+        if self.search_threads > 1 and self._searcher.indexReader.leaves().size() > 1:
+            if self._executor is None:
+                self._executor = Executors.newFixedThreadPool(self.search_threads)
+            self._concurrent_searcher = search.IndexSearcher(self._searcher.indexReader, self._executor)
+
+    def reload(self):
+        self.index.refresh()
+        self._open_searchers()
+        self._doc_cache.clear()
 
     def eval(self, raw_query: str) -> Value:
         expression, ok = lqd_parse(raw_query)
@@ -21,13 +59,13 @@ class Environment(Indexer):
             raise expression
 
         val = None
-        for e in expression.expression_list:
-            if isinstance(e, MetaFn):
-                if e.name in fn_map:
-                    val = fn_map[e.name](self)
+        for tag, e in expression.expression_list:
+            if tag == TAG_META_FN:
+                if e.opcode >= 0:
+                    val = _handlers[e.opcode](self)
                     if val is not None:
                         self.stack.append(val)
-            elif isinstance(e, Value):
+            elif tag == TAG_VALUE:
                 val = e
                 self.stack.append(e)
             else:
@@ -53,12 +91,39 @@ def _doc(env: Environment):
     doc_id = env.stack.pop()
     if not isinstance(doc_id, Value) or not doc_id.is_str():
         return None
-    hits = env.index.indexSearcher.search(query=Q.regexp("id", doc_id.value))
+    if doc_id.value in env._doc_cache:
+        return env._doc_cache[doc_id.value]
+    hits = env._searcher.search(query=Q.term("id", doc_id.value))
     if len(hits) > 0:
-        return LqdDict(hits[0])
+        env._doc_cache[doc_id.value] = LqdDict(hits[0])
+        return env._doc_cache[doc_id.value]
     return None
 
 
+def _docs(env: Environment):
+    # Read ids from the stack until we hit a non-string.
+    ids = []
+    while len(env.stack) > 0 and isinstance(env.stack[-1], Value) and env.stack[-1].is_str():
+        ids.append(env.stack.pop().value)
+    if len(ids) == 0:
+        return None
+    ids.reverse()
+
+    # Look up all the documents that are not cached with a single search.
+    missing = [i for i in dict.fromkeys(ids) if i not in env._doc_cache]
+    if len(missing) > 0:
+        query = Q.any(*[Q.term("id", i) for i in missing])
+        if env._concurrent_searcher is not None:
+            # Unlike lupyne's search, lucene's search(query, n) uses the executor of the searcher.
+            top_docs = env._concurrent_searcher.search(query, len(missing))
+            hits = Hits(env._concurrent_searcher, top_docs.scoreDocs, top_docs.totalHits)
+        else:
+            hits = env._searcher.search(query=query, count=len(missing))
+        for hit in hits:
+            env._doc_cache[hit["id"]] = LqdDict(hit)
+    return LqdList([env._doc_cache[i] for i in ids if i in env._doc_cache])
+
+
 def _fields(env: Environment):
     d = _doc(env)
     if d is None:
@@ -83,18 +148,19 @@ def _select(env: Environment):
     # Get the keys.
     # Read from the stack until we hit a non-string.
     keys = []
-    while len(env.stack) > 0:
-        k = env.stack.pop()
-        if not isinstance(k, Value) or not k.is_str():
-            env.stack.append(k)
-            break
-        keys.append(k.value)
+    while len(env.stack) > 0 and isinstance(env.stack[-1], Value) and env.stack[-1].is_str():
+        keys.append(env.stack.pop().value)
 
     d = env.stack.pop()
     if not isinstance(d, Value) or not d.is_dict():
         return None
 
-    return LqdDict({k: d.value[k] for k in keys})
+    if not keys:
+        return LqdDict({})
+    if len(keys) == 1:
+        return LqdDict({keys[0]: d.value[keys[0]]})
+    # itemgetter returns a tuple of the values when it is given more than one key.
+    return LqdDict(dict(zip(keys, itemgetter(*keys)(d.value))))
 
 
 def _ps(env: Environment):
@@ -110,6 +176,7 @@ fn_map = {
     # Lucene functions.
     ".fields": _fields,
     ".doc": _doc,
+    ".docs": _docs,
 
     # List functions.
     ".ith": _ith,
@@ -122,5 +189,9 @@ fn_map = {
     ".clear": lambda env: env.stack.clear(),
 
     # Misc.
+    ".reload": lambda env: env.reload(),
     ".quit": quit
 }
+
+# The function for each opcode of the parser.
+_handlers = tuple(fn_map[name] for name in OPCODES)
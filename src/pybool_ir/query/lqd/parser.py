@@ -1,68 +1,105 @@
-from pyparsing import (
-    Word,
-    alphanums,
-    Forward,
-    Literal, Suppress, OneOrMore, nums, Optional)
+import re
+
+
+#: The meta functions that can be evaluated. The position of each is its opcode.
+OPCODES = (".fields", ".doc", ".docs", ".ith", ".select", ".ps", ".clear", ".reload", ".quit")
+_OPCODE_MAP = {name: i for i, name in enumerate(OPCODES)}
+
+
+#: Tags for the two kinds of token in an expression.
+TAG_META_FN = 0
+TAG_VALUE = 1
 
 
 class MetaFn:
+    TAG = TAG_META_FN
+
     def __init__(self, tokens):
         self.name = tokens[0] + tokens[1]
+        # Resolved once when the query is parsed, so that evaluating the function is an index into a tuple.
+        self.opcode = _OPCODE_MAP.get(self.name, -1)
 
 
 class Value:
+    TAG = TAG_VALUE
+    # The kind of value, which is cheaper to check than isinstance.
+    KIND = "value"
+
     def __init__(self, tokens):
         self.value = tokens
 
     def is_str(self):
-        return isinstance(self, LqdStr)
+        return self.KIND == "str"
 
     def is_int(self):
-        return isinstance(self, LqdInt)
+        return self.KIND == "int"
 
     def is_list(self):
-        return isinstance(self, LqdList)
+        return self.KIND == "list"
 
     def is_dict(self):
-        return isinstance(self, LqdDict)
+        return self.KIND == "dict"
 
 class LqdStr(Value):
+    KIND = "str"
+
     def __init__(self, tokens):
         super().__init__(tokens)
 
 
 class LqdInt(Value):
+    KIND = "int"
+
     def __init__(self, tokens):
         super().__init__(int(tokens))
 
 
 class LqdList(Value):
+    KIND = "list"
+
     def __init__(self, tokens):
         super().__init__(tokens)
 
 
 class LqdDict(Value):
+    KIND = "dict"
+
     def __init__(self, tokens):
         super().__init__(tokens)
 
 
 class Expression:
     def __init__(self, tokens):
-        self.expression_list = tokens
-
-
-expression = Forward()
-
-# Meta operators.
-t_str = (Suppress('"') + Word(alphanums + "_-.") + Suppress('"')).set_parse_action(lambda x: LqdStr(x[0]))
-t_int = (Word(nums)).set_parse_action(lambda x: LqdInt(x[0]))
-meta_fn = (Literal(".") + Word(alphanums)).set_parse_action(MetaFn)
-
-expression <<= OneOrMore(meta_fn | t_str | t_int).set_parse_action(Expression)
+        # Each token is paired with its tag, so that evaluating the expression does not need isinstance checks.
+        self.expression_list = tuple((token.TAG, token) for token in tokens)
+
+
+# Queries are a sequence of tokens: meta functions (e.g., .doc), quoted strings, and integers.
+# These are simple enough to match with a single regular expression, which is much faster than a pyparsing grammar.
+_LQD_TOKEN = re.compile(r'\s*(?:\.\s*([0-9A-Za-z]+)|"([0-9A-Za-z_\-.]+)"|([0-9]+))')
+_LQD_WHITESPACE = re.compile(r'\s*')
+
+
+def _lqd_tokenize(raw_query: str) -> list:
+    tokens = []
+    pos = 0
+    while (m := _LQD_TOKEN.match(raw_query, pos)) is not None:
+        name, string, integer = m.groups()
+        if name is not None:
+            tokens.append(MetaFn([".", name]))
+        elif string is not None:
+            tokens.append(LqdStr(string))
+        else:
+            tokens.append(LqdInt(integer))
+        pos = m.end()
+    pos = _LQD_WHITESPACE.match(raw_query, pos).end()
+    if len(tokens) == 0 or pos != len(raw_query):
+        raise ValueError(f"Unexpected input at position {pos}: {raw_query[pos:]!r}")
+    return tokens
 
 
 def lqd_parse(raw_query: str) -> (object, bool):
     try:
-        return expression.parse_string(raw_query, parse_all=True)[0], True
+        return Expression(_lqd_tokenize(raw_query)), True
     except Exception as e:
         return e, False
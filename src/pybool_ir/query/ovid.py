@@ -13,20 +13,62 @@ have been applied to this file. It is mostly original.
 # TODO: This code should be replaced with a proper parser of the likes of the Pubmed query parser.
 
 import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List
 
 from pybool_ir.query.pubmed.parser import PubmedQueryParser
 
-
-def _Convert_OVID_To_PUBMED(q_OVID):
-    SubHeading_Dict = {}
-    SubHeading_list = ["Abnormalities", "Administration and Dosage", "Adverse Effects", "Agonists", "Analogs and Derivatives", "Analysis", "Anatomy and Histology", "Antagonists and Inhibitors", "Biosynthesis", "Blood Supply", "Blood", "Cerebrospinal Fluid", "Chemical Synthesis", "Chemically Induced", "Chemistry", "Classification", "Complications", "Congenital", "Contraindications", "Cytology", "Deficiency", "Diagnosis", "Diagnostic Use", "Diet Therapy", "Diagnostic Imaging", "Drug Effects", "Drug Therapy", "Economics", "Education", "Embryology", "Enzymology", "Epidemiology", "Ethics", "Ethnology", "Etiology", "Genetics", "Growth and Development", "History", "Immunology", "Injuries", "Innervation", "Instrumentation", "Isolation and Purification", "Legislation and Jurisprudence", "Manpower", "Metabolism", "Methods", "Microbiology", "Mortality", "Nursing", "Organization and Administration", "Parasitology", "Pathogenicity", "Pathology", "Pharmacokinetics", "Pharmacology", "Physiology",
-                       "Physiopathology", "Poisoning", "Prevention and Control", "Psychology", "Radiation Effects", "Radiotherapy", "Rehabilitation", "Secondary", "Secretion", "Standards", "Statistics and Numerical Data", "Supply and Distribution", "Surgery", "Therapeutic Use", "Therapy", "Toxicity", "Transmission", "Transplantation", "Trends", "Ultrastructure", "Urine", "Utilization", "Veterinary", "Virology"]
-    SubHeading_Ab = ["AB", "AD", "AE", "AG", "AA", "AN", "AH", "AI", "BI", "BS", "BL", "CF", "CS", "CI", "CH", "CL", "CO", "CN", "CT", "CY", "DF", "DI", "DU", "DH", "DG", "DE", "DT", "EC", "ED", "EM", "EN", "EP", "ES", "EH", "ET", "GE", "GD", "HI", "IM", "IN", "IR", "IS", "IP", "LJ", "MA", "ME", "MT", "MI", "MO", "NU", "OG", "PS", "PY", "PA", "PK", "PD", "PH", "PP", "PO", "PC", "PX", "RE", "RT", "RH", "SC", "SE", "ST", "SN", "SD", "SU", "TU", "TH", "TO", "TM", "TR", "TD", "UL", "UR", "UT", "VE", "VI"]
-    SubHeading_Explode = ["AN", "AH", "CY", "EM", "CH", "DI", "ET", "CO", "MI", "OG", "PD", "AE", "PH", "ME", "SN", "EP", "TU", "TH", "SU"]
-
-    # create a dictionary containes SubHeading Abbreviation:SubHeading
-    for i, item in enumerate(SubHeading_Ab):
-        SubHeading_Dict[SubHeading_Ab[i]] = SubHeading_list[i]
+# The patterns used to convert queries are compiled once, rather than looked up for every line and term.
+_RE_HITS = re.compile(r'\([0-9]+\)')
+_RE_LINE = re.compile(r'^\d+\s+[a-zA-Z]+\s+\d+')
+_RE_LINE_NO = re.compile(r'^[0-9]+\.|^[0-9]+\s+\D+|^[0-9]+\s+\d+\s+((and)|(or)|(not))\s+\d+|^#*[0-9]+\s+#*\d+\s+((and)|(or)|(not))\s+#*\d+|^#+\d+\s+|^\d+\s+\d+\s+')
+_RE_SUBHEADING = re.compile(r'\/[a-zA-Z]+')
+_RE_MESH_NAMES = re.compile(r'\[+\D+\]+')
+_RE_SPLIT_OP = re.compile(r' or | not | and ')
+_RE_SPLIT_NOT_AND = re.compile(r' not | and ')
+_RE_ADJ = re.compile(r'adj\d*')
+_RE_OR_RANGE_MULTI = re.compile(r'^or+\/+\d+-+\d+\s+(and+|not+)')
+_RE_OR_RANGE_PART = re.compile(r'^or+\/+\d+-+\d+')
+_RE_OR_RANGE = re.compile(r'^or+\/+\d+(-|‐)+\d+')
+_RE_OP_COMMA = re.compile(r'^(or|and)+\/+\d+,+\d+')
+_RE_PLAIN_LINE = re.compile(r"[A-Za-z,'\- ]+")
+
+#: The boolean operators that combine lines of a query.
+_OPERATIONS = frozenset(('and', 'or', 'not'))
+
+#: OVID field suffixes (and other syntax), and what they are replaced with in PubMed queries.
+_OVID_OPS = {
+    '.pt.': '[Publication Type]',
+    '.ab,ti.': '[Title/Abstract]',
+    '.tw.': '[Text Word]',
+    '.fs.': '[sh:noexp]',
+    '.sh.': '[mh:noexp]',
+    '.ti,ab.': '[Title/Abstract]',
+    '.ti.': '[ti]',
+    '$': '*',
+    '.mp.': '[all]',
+    '.mp': '[all]',
+    '.ab.': '[Title/Abstract]',
+    '.ti,ab,sh.': '[all]',
+    '.ed,dc.': '[Date - Completion]',
+    '.hw.': '[mh]',
+    '[mp=title, original title, abstract, name of substance word, subject heading word]': '',
+}
+# Longer keys are tried first, so that, e.g., ".mp." is not matched as ".mp".
+_RE_OVID_OPS = re.compile('|'.join(re.escape(k) for k in sorted(_OVID_OPS, key=len, reverse=True)))
+
+# MeSH subheadings, and their abbreviations.
+_SUBHEADING_LIST = ["Abnormalities", "Administration and Dosage", "Adverse Effects", "Agonists", "Analogs and Derivatives", "Analysis", "Anatomy and Histology", "Antagonists and Inhibitors", "Biosynthesis", "Blood Supply", "Blood", "Cerebrospinal Fluid", "Chemical Synthesis", "Chemically Induced", "Chemistry", "Classification", "Complications", "Congenital", "Contraindications", "Cytology", "Deficiency", "Diagnosis", "Diagnostic Use", "Diet Therapy", "Diagnostic Imaging", "Drug Effects", "Drug Therapy", "Economics", "Education", "Embryology", "Enzymology", "Epidemiology", "Ethics", "Ethnology", "Etiology", "Genetics", "Growth and Development", "History", "Immunology", "Injuries", "Innervation", "Instrumentation", "Isolation and Purification", "Legislation and Jurisprudence", "Manpower", "Metabolism", "Methods", "Microbiology", "Mortality", "Nursing", "Organization and Administration", "Parasitology", "Pathogenicity", "Pathology", "Pharmacokinetics", "Pharmacology", "Physiology",
+                    "Physiopathology", "Poisoning", "Prevention and Control", "Psychology", "Radiation Effects", "Radiotherapy", "Rehabilitation", "Secondary", "Secretion", "Standards", "Statistics and Numerical Data", "Supply and Distribution", "Surgery", "Therapeutic Use", "Therapy", "Toxicity", "Transmission", "Transplantation", "Trends", "Ultrastructure", "Urine", "Utilization", "Veterinary", "Virology"]
+_SUBHEADING_AB = ["AB", "AD", "AE", "AG", "AA", "AN", "AH", "AI", "BI", "BS", "BL", "CF", "CS", "CI", "CH", "CL", "CO", "CN", "CT", "CY", "DF", "DI", "DU", "DH", "DG", "DE", "DT", "EC", "ED", "EM", "EN", "EP", "ES", "EH", "ET", "GE", "GD", "HI", "IM", "IN", "IR", "IS", "IP", "LJ", "MA", "ME", "MT", "MI", "MO", "NU", "OG", "PS", "PY", "PA", "PK", "PD", "PH", "PP", "PO", "PC", "PX", "RE", "RT", "RH", "SC", "SE", "ST", "SN", "SD", "SU", "TU", "TH", "TO", "TM", "TR", "TD", "UL", "UR", "UT", "VE", "VI"]
+_SUBHEADING_EXPLODE = frozenset(["AN", "AH", "CY", "EM", "CH", "DI", "ET", "CO", "MI", "OG", "PD", "AE", "PH", "ME", "SN", "EP", "TU", "TH", "SU"])
+
+# SubHeading Abbreviation -> SubHeading, which is built once rather than for every query.
+_SUBHEADING_DICT = dict(zip(_SUBHEADING_AB, _SUBHEADING_LIST))
+
+
+def _Convert_OVID_To_PUBMED(q_OVID: List[str]) -> Iterator[str]:
+    # The converted lines are yielded one at a time, so that they can be combined by _convert_to_one_line directly.
 
     # remove empty lines
     for i, q in enumerate(q_OVID):
@@ -34,70 +76,63 @@ def _Convert_OVID_To_PUBMED(q_OVID):
     q_OVID = list(filter(None, q_OVID))
 
     # replace OVID operators with Pubmed operators
-    process = []
-    operations = [' and ', ' or ', ' not ']
-
     for line in q_OVID:
         temp = line.strip()
+
+        # lines of plain text (no line number, fields, subheadings, or operators) are not changed by anything below
+        if _RE_PLAIN_LINE.fullmatch(temp) and 'adj' not in temp and 'exp ' not in temp and _RE_SPLIT_OP.search(temp) is None:
+            yield '( ' + temp + ' )'
+            continue
+
         # convert operation to PubMed format
-        temp = temp.replace('.pt.', '[Publication Type]').replace('.ab,ti.', '[Title/Abstract]').replace('.tw.', '[Text Word]').replace('.fs.', '[sh:noexp]').replace('.sh.', '[mh:noexp]').replace('.ti,ab.', '[Title/Abstract]').replace('.ti.', '[ti]').replace('$', '*').replace('.mp.', '[all]').replace('.mp', '[all]').replace('.ab.', '[Title/Abstract]').replace('.ti,ab,sh.', '[all]').replace('.ed,dc.', '[Date - Completion]').replace('.hw.', '[mh]').replace('[mp=title, original title, abstract, name of substance word, subject heading word]', '')
+        temp = _RE_OVID_OPS.sub(lambda m: _OVID_OPS[m.group(0)], temp)
 
         # remove number of hits from the query line
-        check_hits = re.findall(r'\([0-9]+\)', temp)
+        check_hits = _RE_HITS.search(temp)
         if check_hits:
-            temp = temp.replace(check_hits[0], '')
+            temp = temp.replace(check_hits.group(0), '')
 
         # remove line number
-        check_line = re.findall(r'^\d+\s+[a-zA-Z]+\s+\d+', temp)
-        check_line_no = re.findall(r'^[0-9]+\.|^[0-9]+\s+\D+|^[0-9]+\s+\d+\s+((and)|(or)|(not))\s+\d+|^#*[0-9]+\s+#*\d+\s+((and)|(or)|(not))\s+#*\d+|^#+\d+\s+|^\d+\s+\d+\s+', temp)
-        if check_line_no and not check_line:
-            temp = temp.split()[1:]
-            temp = ' '.join(temp)
+        if _RE_LINE_NO.search(temp) and not _RE_LINE.search(temp):
+            temp = ' '.join(temp.split()[1:])
 
         # check if line containes multible operations
-        flag = 0
-        for oper in operations:
-            if oper in temp:
-                flag = 1
-
-        if flag == 1:  # if line containes multible operations
+        if _RE_SPLIT_OP.search(temp) is not None:  # if line containes multible operations
             terms = []
             op_order = []
 
             for term in temp.split():
-                if (' ' + term + ' ') in operations:
+                if term in _OPERATIONS:
                     op_order.append(term)
 
-            for term in re.split(r' or | not | and ', temp):
-                check = re.findall(r'\/[a-zA-Z]+', term)
+            for term in _RE_SPLIT_OP.split(temp):
+                check = _RE_SUBHEADING.search(term)
                 # find subeadding abbreviation
-                if check and (len(check[0]) == 3) and check[0].lower() != '/or':
-                    meshs_names = re.findall(r'\[+\D+\]+', term.split('/')[1])
+                if check and (len(check.group(0)) == 3) and check.group(0).lower() != '/or':
+                    after = term.split('/', 2)[1]
+                    meshs_names = _RE_MESH_NAMES.findall(after)
                     if meshs_names:
-                        meshs = (term.split('/')[1]).replace(meshs_names[1], '')
+                        meshs = after.replace(meshs_names[1], '')
                         term = term.replace(meshs_names[1], '')
                     else:
-                        meshs = term.split('/')[1]
+                        meshs = after
 
                     mesh_set = meshs.split(',')
 
-                    temp_sub = ''
+                    terms_sub = []
 
                     for i in range(len(mesh_set)):
                         abbr = mesh_set[i].replace(')', '').strip()
-                        mesh = SubHeading_Dict[abbr.upper()]
+                        mesh = _SUBHEADING_DICT[abbr.upper()]
                         if 'exp ' in term:
                             term_ = '"' + term.replace(meshs, mesh + '"[MeSH]').replace('exp ', '')
 
                         else:
                             term_ = '"' + term.replace(meshs, mesh + '"[mesh:noexp]')
 
-                        if i == 0:
-                            temp_sub = term_
-                        else:
-                            temp_sub = temp_sub + ' OR ' + term_
+                        terms_sub.append(term_)
 
-                    term = temp_sub
+                    term = ' OR '.join(terms_sub)
 
                 else:
                     if '/' and 'exp ' in term:
@@ -111,56 +146,54 @@ def _Convert_OVID_To_PUBMED(q_OVID):
 
                 terms.append(term.strip())
 
-            q = ''
+            parts = []
             for i, term in enumerate(terms):
+                parts.append(term)
                 if i < len(op_order):
-                    q = q + ' ' + term + ' ' + op_order[i]
-                else:
-                    q = q + ' ' + term
+                    parts.append(op_order[i])
+            q = ' '.join(parts)
 
             # replace adj with and operator
-            q = re.sub(r'adj\d*', 'and', q)
-            process.append('(' + q.strip() + ' )')
+            q = _RE_ADJ.sub('and', q)
+            yield '(' + q.strip() + ' )'
 
             # *******************************************************************
         else:
             # check if there is a subheading
-            check = re.findall(r'\/[a-zA-Z]+', temp)
-            if check and (len(check[0]) == 3) and check[0].lower() != '/or':
-                meshs_names = re.findall(r'\[+\D+\]+', temp.split('/')[1])
+            check = _RE_SUBHEADING.search(temp)
+            if check and (len(check.group(0)) == 3) and check.group(0).lower() != '/or':
+                after = temp.split('/', 2)[1]
+                meshs_names = _RE_MESH_NAMES.findall(after)
                 if meshs_names:
-                    meshs = (temp.split('/')[1]).replace(meshs_names[0], '')
+                    meshs = after.replace(meshs_names[0], '')
                     temp = temp.replace(meshs_names[0], '')
                 else:
-                    meshs = temp.split('/')[1]
+                    meshs = after
 
                 mesh_set = meshs.split(',')
 
-                temp_sub = ''
-
                 if (len(mesh_set)) > 1:
+                    terms_sub = []
                     for i in range(len(mesh_set)):
                         abbr = mesh_set[i].replace(')', '').strip()
-                        mesh = SubHeading_Dict[abbr.upper()]
+                        mesh = _SUBHEADING_DICT[abbr.upper()]
                         if 'exp ' in temp:
                             term_ = '"' + temp.replace(meshs, mesh + '"[MeSH]').replace('exp ', '')
 
                         else:
                             term_ = '"' + temp.replace(meshs, mesh + '"[mesh:noexp]')
 
-                        if i == 0:
-                            temp_sub = term_
-                        else:
-                            temp_sub = temp_sub + ' OR ' + term_
+                        terms_sub.append(term_)
+                    temp_sub = ' OR '.join(terms_sub)
                 else:
                     if 'exp ' in temp:
-                        temp_sub = '"' + temp.replace(meshs, SubHeading_Dict[meshs.split()[0].upper()] + '"[MeSH]').replace('exp ', '')
+                        temp_sub = '"' + temp.replace(meshs, _SUBHEADING_DICT[meshs.split()[0].upper()] + '"[MeSH]').replace('exp ', '')
                     else:
-                        temp_sub = '"' + temp.replace(meshs, SubHeading_Dict[meshs.split()[0].upper()] + '"[mesh:noexp]')
+                        temp_sub = '"' + temp.replace(meshs, _SUBHEADING_DICT[meshs.split()[0].upper()] + '"[mesh:noexp]')
 
                 # replace adj with and operator
-                temp_sub = re.sub(r'adj\d*', 'and', temp_sub)
-                process.append('( ' + temp_sub.strip() + ' )')
+                temp_sub = _RE_ADJ.sub('and', temp_sub)
+                yield '( ' + temp_sub.strip() + ' )'
 
             else:
                 if '/' and 'exp ' in temp:
@@ -171,87 +204,65 @@ def _Convert_OVID_To_PUBMED(q_OVID):
                     temp = temp.replace('/', '[Mesh:NoExp]')
 
                 # replace adj with and operator
-                temp = re.sub(r'adj\d*', 'and', temp)
-                process.append('( ' + temp.strip() + ' )')
-
-    return process
+                temp = _RE_ADJ.sub('and', temp)
+                yield '( ' + temp.strip() + ' )'
 
 
 # ******************************************************************************
 
-def _convert_to_one_line(query):
-    q = {}
-
-    for i, line in enumerate(query.split('\n')):
-        q[i + 1] = line
+def _convert_to_one_line(lines: Iterable[str]) -> Dict[int, str]:
+    q = dict(enumerate(lines, start=1))
 
     # find combined operations or/1-3 convert to 1 or 2 or 3
     for key, value in q.items():
         temp = value.lower().replace('(', '').replace(')', '').strip()
-        multi = 0
-        if re.findall(r'^or+\/+\d+-+\d+\s+(and+|not+)', temp):
-            multi = 1
-            opemul = re.findall(r'^or+\/+\d+-+\d+\s+(and+|not+)', temp)
-
-        if multi == 1:
-            parts = re.split(r' not | and ', temp)
+        opemul = _RE_OR_RANGE_MULTI.search(temp)
+        if opemul:
+            parts = _RE_SPLIT_NOT_AND.split(temp)
             q_ = ''
             for part in parts:
-                if re.findall(r'^or+\/+\d+-+\d+', part):
-                    oper = part.split('/')[0]
-                    start = int((part.split('/')[1]).split('-')[0])
+                if _RE_OR_RANGE_PART.search(part):
+                    oper, after = part.split('/', 2)[:2]
+                    start = int(after.split('-')[0])
                     end = int(part.split('-')[1])
 
-                    part_q = ''
-                    while start <= end:
-                        if start == end:
-                            part_q = part_q + ' ' + str(start)
-                        else:
-                            part_q = part_q + ' ' + str(start) + ' ' + oper
-                        start += 1
+                    part_q = f' {oper} '.join(map(str, range(start, end + 1)))
 
-                elif re.findall(r'^(or|and)+\/+\d+,+\d+', part):
-                    oper = part.split('/')[0]
-                    part_q = part.split('/')[1].replace(',', ' ' + oper + ' ')
+                elif _RE_OP_COMMA.search(part):
+                    oper, after = part.split('/', 2)[:2]
+                    part_q = after.replace(',', ' ' + oper + ' ')
 
                 if q_ == '':
-                    q_ = part_q + ' ' + opemul[0] + ' '
+                    q_ = part_q + ' ' + opemul.group(1) + ' '
                 else:
                     q_ = q_ + part_q
 
             q[key] = '( ' + q_ + ' )'
 
 
-        elif re.findall(r'^or+\/+\d+(-|‐)+\d+', temp):
-            oper = temp.split('/')[0]
-            start = int((temp.split('/')[1]).split('-')[0])
+        elif _RE_OR_RANGE.search(temp):
+            oper, after = temp.split('/', 2)[:2]
+            start = int(after.split('-')[0])
             end = int(temp.split('-')[1])
 
-            temp_q = ''
-            while start <= end:
-                if start == end:
-                    temp_q = temp_q + ' ' + str(start)
-                else:
-                    temp_q = temp_q + ' ' + str(start) + ' ' + oper
-                start += 1
+            temp_q = f' {oper} '.join(map(str, range(start, end + 1)))
 
             q[key] = '( ' + temp_q + ' )'
 
 
-        elif re.findall(r'^(or|and)+\/+\d+,+\d+', temp):
-            oper = temp.split('/')[0]
-            temp_q = temp.split('/')[1].replace(',', ' ' + oper + ' ')
+        elif _RE_OP_COMMA.search(temp):
+            oper, after = temp.split('/', 2)[:2]
+            temp_q = after.replace(',', ' ' + oper + ' ')
             q[key] = '( ' + temp_q + ' )'
 
-    operations = ['and', 'or', 'not']
-
     for key, value in q.items():
         terms = value.replace('(', '').replace(')', '').split()
+        lower_terms = [term.lower() for term in terms]
         a = [a for a in terms]
 
         # replace each number with the equivalent line
         for j, term in enumerate(terms):
-            if terms[j].isdigit() and (terms[j - 1].lower() in operations or terms[j + 1].lower() in operations):
+            if term.isdigit() and ((j > 0 and lower_terms[j - 1] in _OPERATIONS) or (j + 1 < len(terms) and lower_terms[j + 1] in _OPERATIONS)):
                 index = terms[j]
                 # [HS] This method is slightly less fragile than the previous one.
                 a[j] = q[int(index)]
@@ -264,11 +275,16 @@ def _convert_to_one_line(query):
 # ******************************************************************************
 # ******************************************************************************
 
-def transform(query: str):
-    parser = PubmedQueryParser()
+@lru_cache(maxsize=1)
+def _parser() -> PubmedQueryParser:
+    # The parser does not keep any state between queries, so the same one (and its grammar) is used for every query.
+    return PubmedQueryParser()
+
+
+def transform(query: str) -> str:
+    parser = _parser()
     q_OVID = query.split('\n')
-    q_con = _Convert_OVID_To_PUBMED(q_OVID)
-    q_Pub = _convert_to_one_line('\n'.join(q_con))
+    q_Pub = _convert_to_one_line(_Convert_OVID_To_PUBMED(q_OVID))
     if 'limit' in list(q_Pub.values())[-1]:
         return str(parser.parse_ast(list(q_Pub.values())[-2]))
     else:
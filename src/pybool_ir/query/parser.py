@@ -3,6 +3,7 @@ Base classes for representing queries.
 """
 
 from abc import ABC, abstractmethod
+from typing import Tuple
 
 import lucene
 from lupyne import engine
@@ -10,6 +11,8 @@ from lupyne import engine
 from pybool_ir.query.ast import ASTNode
 
 MAX_CLAUSES = 60_000
+# Number of intermediate matches that pyparsing memoizes while parsing a query (the default of 128 is small for long queries).
+PACKRAT_CACHE_SIZE = 2048
 
 assert lucene.getVMEnv() or lucene.initVM()
 Q = engine.Query
@@ -39,6 +42,13 @@ class QueryParser(ABC):
           """
         raise NotImplementedError()
 
+    def parse_both(self, raw_query: str) -> Tuple[ASTNode, Q]:
+        """
+          Parse a raw query into both an AST node and a lucene query.
+          Parsers may override this to create both from a single walk of the parsed query.
+          """
+        return self.parse_ast(raw_query), self.parse_lucene(raw_query)
+
     @abstractmethod
     def format(self, node: ASTNode) -> str:
         """
@@ -3,10 +3,16 @@ Implementation of a PubMed query parser.
 """
 
 import datetime
+import multiprocessing
+import os
+import re
+import sys
 from abc import abstractmethod
 from calendar import monthrange
-from copy import deepcopy
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import Iterable, List, Tuple
 
 import lucene
 from lupyne import engine
@@ -18,11 +24,12 @@ from pyparsing import (
     Optional,
     alphanums,
     Forward,
+    ParserElement,
     CaselessKeyword,
-    Suppress, infix_notation, OpAssoc, Group, Literal, Combine, OneOrMore, nums, White, PrecededBy)
+    Suppress, infix_notation, OpAssoc, Group, Literal, Combine, OneOrMore, nums, White, PrecededBy, Regex)
 
 from pybool_ir.datasets.pubmed.mesh import MeSHTree
-from pybool_ir.query.parser import MAX_CLAUSES
+from pybool_ir.query.parser import MAX_CLAUSES, PACKRAT_CACHE_SIZE
 from pybool_ir.query.parser import QueryParser
 from pybool_ir.query.ast import OperatorNode, AtomNode, ASTNode
 from pybool_ir.query.pubmed import fields
@@ -31,7 +38,12 @@ from pybool_ir.query.units import UnitAtom, QueryAtom
 assert lucene.getVMEnv() or lucene.initVM()
 Q = engine.Query
 search.BooleanQuery.setMaxClauseCount(MAX_CLAUSES)  # There is apparently a cap for efficiency reasons.
-analyzer = engine.analyzers.Analyzer.standard()
+
+# Memoize intermediate matches, which avoids re-parsing the operands of deeply nested boolean queries.
+ParserElement.enablePackrat(cache_size_limit=PACKRAT_CACHE_SIZE)
+
+# Boolean operators. These are shared by the grammar of every parser, rather than created for each one.
+_AND, _OR, _NOT = map(CaselessKeyword, "AND OR NOT".split())
 
 
 # --------------------------------------
@@ -50,24 +62,79 @@ class _ParseNode(object):
     def __ast__(self):
         raise NotImplementedError()
 
+    @abstractmethod
+    def __build__(self, tree: MeSHTree, optional_fields: List[str] = None):
+        """Create both the AST object and the Lucene query in a single walk of the parse tree."""
+        raise NotImplementedError()
+
 
 class _OpNode:
     def __init__(self, tokens):
-        self.operator = tokens[0][1]
-        self.operands = tokens[0][::2]
+        # Operators and operands alternate, e.g., [a, OR, b, OR, c].
+        toks = tokens[0]
+        self.operator = toks[1]
+        self.operands = toks[::2]
 
     def __repr__(self):
         return "({}<{}>:{!r})".format(self.__class__.__name__,
                                       self.operator, self.operands)
 
+    def _fold(self, leaf, combine):
+        # Walk the operands iteratively (in post-order), since boolean queries can be very deeply nested.
+        # `leaf` is called on each atom, and `combine` on each operator with the results of its operands.
+        built = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, _OpNode):
+                built[id(node)] = leaf(node)
+            elif expanded:
+                built[id(node)] = combine(node, [built[id(child)] for child in node.operands])
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.operands)
+        return built[id(self)]
+
     def __ast__(self):
-        return OperatorNode(operator=self.operator, children=[node.__ast__() for node in self.operands])
+        return self._fold(lambda atom: atom.__ast__(),
+                          lambda node, children: OperatorNode(operator=node.operator, children=tuple(children)))
+
+    def __query__(self, tree: MeSHTree, optional_fields: List[str] = None):
+        return self._fold(lambda atom: atom.__query__(tree, optional_fields=optional_fields),
+                          lambda node, queries: node._combine(queries))
+
+    def __build__(self, tree: MeSHTree, optional_fields: List[str] = None):
+        def combine(node, built):
+            children, queries = zip(*built)
+            return OperatorNode(operator=node.operator, children=children), node._combine(queries)
+
+        return self._fold(lambda atom: atom.__build__(tree, optional_fields=optional_fields), combine)
+
+    @abstractmethod
+    def _combine(self, queries):
+        """Combine the Lucene queries of the operands."""
+        raise NotImplementedError()
+
+
+def _boolean(occur, queries: Iterable[Q]) -> search.BooleanQuery:
+    # Like Q.boolean, but takes any iterable of queries, so callers do not need to build a list to unpack into it.
+    builder = search.BooleanQuery.Builder()
+    for query in queries:
+        builder.add(query, occur)
+    return builder.build()
+
+
+def _disj(queries: Iterable[Q]) -> search.BooleanQuery:
+    return _boolean(search.BooleanClause.Occur.SHOULD, queries)
+
+
+def _conj(queries: Iterable[Q]) -> search.BooleanQuery:
+    return _boolean(search.BooleanClause.Occur.MUST, queries)
 
 
 class _NotOp(_OpNode, _ParseNode):
-    def __query__(self, tree: MeSHTree, optional_fields: List[str] = None):
-        lhs = self.operands[0].__query__(tree, optional_fields=optional_fields)
-        rhs = self.operands[1].__query__(tree, optional_fields=optional_fields)
+    def _combine(self, queries):
+        lhs, rhs = queries[0], queries[1]
         builder = search.BooleanQuery.Builder()
         builder.add(lhs, search.BooleanClause.Occur.SHOULD)
         builder.add(rhs, search.BooleanClause.Occur.MUST_NOT)
@@ -75,20 +142,58 @@ class _NotOp(_OpNode, _ParseNode):
 
 
 class _BinOp(_OpNode, _ParseNode):
-    def __query__(self, tree: MeSHTree, optional_fields: List[str] = None):
-        if self.operator == "AND":
-            op = Q.all
-        else:
-            op = Q.any
-        return op(*[operand.__query__(tree, optional_fields=optional_fields) for operand in self.operands])
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        # Choose how to combine the operands once, when the query is parsed, rather than every time it is evaluated.
+        self._op = _conj if self.operator == "AND" else _disj
+
+    def _combine(self, queries):
+        return self._op(queries)
 
 
 # The following classes are used to create Lucene queries once parsed.
 
+#: The text fields that are searched for an "All Fields" query.
+_ALL_FIELDS = ("title", "abstract")
+
+#: The fields that contain MeSH headings (or qualifiers), which are exploded using the MeSH tree.
+_MESH_FIELDS = frozenset(("mesh_heading_list", "mesh_major_heading_list", "mesh_qualifier_list"))
+
+
+@lru_cache(maxsize=4096)
+def _all_fields_queries(query: str) -> tuple:
+    # Lucene queries are immutable, so the same queries can be reused for terms that appear in many queries.
+    return tuple(op(f, query) for op in (Q.wildcard, Q.phrase, Q.term) for f in _ALL_FIELDS)
+
+
+@lru_cache(maxsize=None)
+def _dt_field(name: str) -> DateTimeField:
+    # Date fields only create queries, so one field can be shared by every date atom (there are only a few date fields).
+    return DateTimeField(name, stored=True)
+
+
+# The same months come up in many date atoms.
+_monthrange = lru_cache(maxsize=4096)(monthrange)
+
+
+@lru_cache(maxsize=4096)
+def _date_range_query(name: str, start: datetime.date, stop: datetime.date) -> Q:
+    # Dates are indexed as points of timestamps, so every query converts its dates to timestamps.
+    # The same dates (e.g., whole years) are used by many queries, and Lucene queries are immutable, so they are shared.
+    return _dt_field(name).range(start, stop)
+
+
+@lru_cache(maxsize=4096)
+def _date_prefix_query(name: str, date: datetime.date) -> Q:
+    return _dt_field(name).prefix(date)
+
+
 class _Atom(_ParseNode):
     def __init__(self, tokens):
         self.unit: UnitAtom = tokens[0][0]
         self.field = tokens[0][1] if len(tokens[0]) > 1 else _default_field
+        # The last Lucene query created for this atom, along with the tree and optional fields it was created with.
+        self._last_query = None
 
     def __repr__(self):
         return f"{self.unit}[{self.field}]"
@@ -96,52 +201,53 @@ class _Atom(_ParseNode):
     def __ast__(self):
         return AtomNode(query=self.unit.raw_query, field=self.field)
 
+    def __build__(self, tree: MeSHTree, optional_fields: List[str] = None):
+        return self.__ast__(), self.__query__(tree, optional_fields=optional_fields)
+
     @staticmethod
-    def has_mesh_field(mapped_fields: List[str]) -> bool:
-        return "mesh_heading_list" in mapped_fields or \
-            "mesh_major_heading_list" in mapped_fields or \
-            "mesh_qualifier_list" in mapped_fields
+    def has_mesh_field(mapped_fields: Tuple[str, ...]) -> bool:
+        return not _MESH_FIELDS.isdisjoint(mapped_fields)
 
     def __query__(self, tree: MeSHTree, optional_fields: List[str] = None):
-        if optional_fields is not None and self.field.__repr__() in optional_fields:
-            mapped_fields = [self.field.__repr__()]
+        # Parsed queries are cached, so the same atom is often translated again (with the same tree and optional fields).
+        # Lucene queries are immutable, so the query from last time can be reused rather than exploding the headings again.
+        last = self._last_query
+        if last is not None and last[0] is tree and last[1] == optional_fields:
+            return last[2]
+        query = self._create_query(tree, optional_fields)
+        self._last_query = (tree, optional_fields, query)
+        return query
+
+    def _create_query(self, tree: MeSHTree, optional_fields: List[str] = None):
+        if optional_fields is not None and self.field._repr in optional_fields:
+            mapped_fields = (self.field._repr,)
         else:
-            mapped_fields = deepcopy(self.field.lucene_fields())
+            # The mapping is immutable, so it does not need to be copied.
+            mapped_fields = self.field.lucene_fields()
         expansion_atoms = []
 
         # Special field that is not actually indexed.
         if mapped_fields[0] == "all_fields":
             if (len(self.unit.query) <= tree.minimum_short_mesh_length and self.unit.query in tree.short_mesh_headings) or len(self.unit.query) > tree.minimum_short_mesh_length:
-                headings = [x for x in list(tree.locations.keys()) if self.unit.query.lower() in x]
-                for heading in headings:
-                    for exploded_heading in tree.explode(heading):
-                        expansion_atoms.append(Q.regexp("mesh_heading_list", exploded_heading))
-                        expansion_atoms.append(Q.regexp("publication_type", exploded_heading))
-            if " " in self.unit.analyzed_query:
-                expansion_atoms += [Q.near("title", *self.unit.analyzed_query.split()),
-                                    Q.near("abstract", *self.unit.analyzed_query.split())]
-            return Q.any(
-                *[
-                     Q.wildcard("title", self.unit.analyzed_query),
-                     Q.wildcard("abstract", self.unit.analyzed_query),
-                     Q.phrase("title", self.unit.analyzed_query),
-                     Q.phrase("abstract", self.unit.analyzed_query),
-                     Q.term("title", self.unit.analyzed_query),
-                     Q.term("abstract", self.unit.analyzed_query)
-                 ] + expansion_atoms
-            )
+                headings = tree.headings_containing(self.unit.query.lower())
+                exploded_headings = [exploded_heading for heading in headings for exploded_heading in tree.explode(heading)]
+                if exploded_headings:
+                    expansion_atoms += [Q.terms("mesh_heading_list", exploded_headings), Q.terms("publication_type", exploded_headings)]
+            analyzed_query = self.unit.analyzed_query
+            if " " in analyzed_query:
+                expansion_atoms += [Q.near(f, *self.unit.analyzed_tokens) for f in _ALL_FIELDS]
+            return _disj(chain(_all_fields_queries(analyzed_query), expansion_atoms))
 
         # Special case for MeSH query with qualifier.
         if isinstance(self.unit, _MeSHAndQualifierAtom):
             if self.field.field_op is None:
-                for heading in tree.explode(self.unit.query[0]):
-                    expansion_atoms.append(Q.regexp("mesh_heading_list", heading))
+                expansion_atoms.append(Q.terms("mesh_heading_list", tree.explode(self.unit.query[0])))
 
             lhs = [Q.phrase(f, self.unit.query[0]) for f in mapped_fields]
             rhs = Q.phrase("mesh_qualifier_list", self.unit.query[1])
             return Q.boolean(search.BooleanClause.Occur.MUST,
                              *[
-                                 Q.any(*lhs + expansion_atoms),
+                                 _disj(chain(lhs, expansion_atoms)),
                                  rhs
                              ])
 
@@ -150,61 +256,60 @@ class _Atom(_ParseNode):
             if mapped_fields[0] == "mesh_qualifier_list":
                 return Q.term(mapped_fields[0], self.unit.query.lower().replace(" and ", " & "))
             if self.field.field_op is None:
-                for heading in tree.explode(self.unit.query):
-                    expansion_atoms.append(Q.regexp("mesh_heading_list", heading))
-                expansion_atoms = expansion_atoms[1:]
+                # The first exploded heading is the heading itself, which is matched in the mapped field below.
+                expansion_atoms.append(Q.terms("mesh_heading_list", tree.explode(self.unit.query)[1:]))
                 expansion_atoms.append(Q.regexp(mapped_fields[0], tree.map_heading(self.unit.query)))
-                return Q.any(*expansion_atoms)
+                return _disj(expansion_atoms)
             else:
                 return Q.regexp(mapped_fields[0], tree.map_heading(self.unit.query))
 
         if "publication_type" in mapped_fields:
             if self.field.field_op is None:
-                for heading in tree.explode(self.unit.query):
-                    expansion_atoms.append(Q.regexp("publication_type", heading))
-                return Q.any(*expansion_atoms)
+                return Q.terms("publication_type", tree.explode(self.unit.query))
             else:
                 return Q.regexp("publication_type", tree.map_heading(self.unit.query))
 
         if "supplementary_concept_list" in mapped_fields:
-            return Q.any(*[Q.regexp("supplementary_concept_list", self.unit.query.lower()),
-                           Q.regexp("supplementary_concept_list", self.unit.query)])
+            return _disj((Q.regexp("supplementary_concept_list", self.unit.query.lower()),
+                          Q.regexp("supplementary_concept_list", self.unit.query)))
 
         # Phrases.
         if isinstance(self.unit, QueryAtom):
-            if " " not in self.unit.analyzed_query:
+            analyzed_query = self.unit.analyzed_query
+            if " " not in analyzed_query:
                 op = Q.term
                 if self.unit.fuzzy:
                     op = Q.wildcard
                 if len(mapped_fields) == 1:
-                    return op(mapped_fields[0], self.unit.analyzed_query)
-                return Q.any(*[op(f, self.unit.analyzed_query) for f in mapped_fields])
+                    return op(mapped_fields[0], analyzed_query)
+                return _disj(op(f, analyzed_query) for f in mapped_fields)
+            tokens = self.unit.analyzed_tokens
             if len(mapped_fields) == 1:
-                return Q.near(mapped_fields[0], *self.unit.analyzed_query.split())
-            return Q.any(*[Q.near(f, *self.unit.analyzed_query.split()) for f in mapped_fields])
+                return Q.near(mapped_fields[0], *tokens)
+            return _disj(Q.near(f, *tokens) for f in mapped_fields)
 
         # Dates.
         elif isinstance(self.unit, _DateAtom):
             assert len(mapped_fields) == 1
             # field = indexer.set(mapped_fields[0], engine.DateTimeField, stored=True)
-            field = DateTimeField(mapped_fields[0], stored=True)
+            field = mapped_fields[0]
 
             # There is a special case if we have the fully specified date.
             if self.unit.day is not None:
-                return field.prefix(datetime.date(self.unit.year, self.unit.month, self.unit.day))
+                return _date_prefix_query(field, datetime.date(self.unit.year, self.unit.month, self.unit.day))
 
             # Otherwise, we are actually looking at a range.
             elif self.unit.month is not None:
-                day_start, day_end = monthrange(self.unit.year, self.unit.month)
-                return field.range(datetime.date(self.unit.year, self.unit.month, day_start), datetime.date(self.unit.year, self.unit.month, day_end))
-            _, day_end = monthrange(self.unit.year, 12)
-            return field.range(datetime.date(self.unit.year, 1, 1), datetime.date(self.unit.year, 12, day_end))
+                day_start, day_end = _monthrange(self.unit.year, self.unit.month)
+                return _date_range_query(field, datetime.date(self.unit.year, self.unit.month, day_start), datetime.date(self.unit.year, self.unit.month, day_end))
+            _, day_end = _monthrange(self.unit.year, 12)
+            return _date_range_query(field, datetime.date(self.unit.year, 1, 1), datetime.date(self.unit.year, 12, day_end))
 
         # Date ranges.
         elif isinstance(self.unit, _DateRangeAtom):
             assert len(mapped_fields) == 1
             # field = indexer.set(mapped_fields[0], engine.DateTimeField, stored=True)
-            field = DateTimeField(mapped_fields[0], stored=True)
+            field = mapped_fields[0]
 
             # First, create the "from date".
             if self.unit.date_from.day is not None:
@@ -218,14 +323,14 @@ class _Atom(_ParseNode):
             if self.unit.date_to.day is not None:
                 date_to = datetime.date(self.unit.date_to.year, self.unit.date_to.month, self.unit.date_to.day)
             elif self.unit.date_to.month is not None:
-                _, day_end = monthrange(self.unit.date_to.year, self.unit.date_to.month)
+                _, day_end = _monthrange(self.unit.date_to.year, self.unit.date_to.month)
                 date_to = datetime.date(self.unit.date_to.year, self.unit.date_to.month, day_end)
             else:
-                _, day_end = monthrange(self.unit.date_to.year, 12)
+                _, day_end = _monthrange(self.unit.date_to.year, 12)
                 date_to = datetime.date(self.unit.date_to.year, 12, day_end)
 
             # Then, create the range query using the "from date" and "to date".
-            return field.range(date_from, date_to)
+            return _date_range_query(field, date_from, date_to)
 
 
 class _MeSHAndQualifierAtom(UnitAtom):
@@ -307,10 +412,15 @@ class _DateRangeAtom(UnitAtom):
 
 class _FieldUnit:
     def __init__(self, tokens):
-        self.field = tokens[0]
+        # Field names repeat across atoms, so share a single string for each.
+        self.field = sys.intern(tokens[0])
         self.field_op = None
         if len(tokens) > 1:
             self.field_op = tokens[1]
+        # Both are needed for every atom that has this field, so they are only worked out once.
+        # An unknown field is only an error once the Lucene query is built, so it is not checked here.
+        self._repr = f"{self.field}{self.field_op or ''}"
+        self._mapped = fields.mapping.get(self.field)
 
     @classmethod
     def from_str(cls, s: str) -> "_FieldUnit":
@@ -318,54 +428,70 @@ class _FieldUnit:
         return cls(parts) if len(parts) > 0 else cls([s])
 
     def __repr__(self):
-        if self.field_op is not None:
-            return f"{self.field}{self.field_op}"
-        return f"{self.field}"
+        return self._repr
 
-    def lucene_fields(self):
-        try:
-            return fields.mapping[self.field]
-        except KeyError:
+    def lucene_fields(self) -> Tuple[str, ...]:
+        if self._mapped is None:
             raise ValueError(f"Field {self.field} is not a valid field.")
+        return self._mapped
 
 
 # --------------------------------------
 
 
+@lru_cache(maxsize=1)
+def _default_tree() -> MeSHTree:
+    # Reading the MeSH tree is slow (and it may need to be downloaded first), so the default tree is only
+    # loaded once a parser actually needs it, and is then shared by every parser.
+    return MeSHTree()
+
+
 class PubmedQueryParser(QueryParser):
     """
     A parser for Pubmed queries.
+    If no MeSH tree is given, the default tree is loaded the first time it is needed to create a lucene query.
     """
 
-    def __init__(self, tree: MeSHTree = MeSHTree(), optional_fields: List[str] = None, optional_operators: List[str] = None):
+    def __init__(self, tree: MeSHTree = None, optional_fields: List[str] = None, optional_operators: List[str] = None):
         super().__init__()
-        self.tree = tree
-        self.optional_fields = optional_fields
+        self._tree = tree
+        # Every atom checks whether its field is one of the optional fields, so they are kept in a set.
+        self.optional_fields = frozenset(optional_fields) if optional_fields else None
         self.optional_operators = optional_operators
+        # The grammar only depends on the optional operators, so it is only built once.
+        self._expression = self._grammar()
+        # The same queries are often parsed many times (e.g., once for the AST and again for lucene).
+        # Parsed queries do not depend on the MeSH tree or optional fields, which are only used to create lucene queries.
+        self._parse_cached = lru_cache(maxsize=1024)(self._parse)
+
+    @property
+    def tree(self) -> MeSHTree:
+        if self._tree is None:
+            self._tree = _default_tree()
+        return self._tree
+
+    @tree.setter
+    def tree(self, tree: MeSHTree):
+        self._tree = tree
 
     @classmethod
     def default_field(cls) -> str:
         return "All Fields"
 
-    def _parse(self, raw_query: str) -> _ParseNode:
-        # Makes parsing faster. (?)
-        # ParserElement.enablePackrat()
-
+    def _grammar(self) -> Forward:
         expression = Forward()
 
-        # Boolean operators.
-        AND, OR, NOT = map(
-            CaselessKeyword, "AND OR NOT".split()
-        )
-
         # Atoms.
         valid_chars = "αβ-–_,'’&*?."
         valid_quote_chars = valid_chars + "[]/()"
-        valid_phrase = (~PrecededBy(Literal("*")) & (Word(alphanums + valid_quote_chars + " ") ^ Literal("*")))
-        valid_quoteless_phrase = (~PrecededBy(Literal("*")) & (Word(alphanums + valid_chars) ^ Literal("*")))
-
-        phrase = Combine(Literal('"') + valid_phrase + Literal('"')).set_parse_action(QueryAtom)
-        quoteless_phrase = (Combine(OneOrMore(valid_quoteless_phrase | White(" ", max=1) + ~(White() | AND | OR | NOT)))).set_parse_action(QueryAtom)
+        # "*" is one of the valid characters, so a lone "*" is matched by the Word itself.
+        # (Matching it separately with `^ Literal("*")` would only make pyparsing try both and keep the longest.)
+        valid_quoteless_phrase = (~PrecededBy(Literal("*")) & Word(alphanums + valid_chars))
+
+        # Quoted phrases are matched with a single regular expression, rather than (the equivalent) Combine(Literal + Word + Literal).
+        # QuotedString is not used, since it would accept any character inside the quotes.
+        phrase = Regex('"[' + re.escape(alphanums + valid_quote_chars + " ") + ']+"').set_parse_action(QueryAtom)
+        quoteless_phrase = (Combine(OneOrMore(valid_quoteless_phrase | White(" ", max=1) + ~(White() | _AND | _OR | _NOT)))).set_parse_action(QueryAtom)
         mesh_and_qualifier = (Suppress(Optional(Literal('"'))) + (Word(alphanums + valid_chars + " ") + Suppress(Literal("/")) + Word(alphanums + valid_chars + " ")) + Suppress(Optional(Literal('"')))).set_parse_action(_MeSHAndQualifierAtom)
         date = (Word(nums, exact=4) + Optional(Suppress("/") + Word(nums, exact=2) + Optional(Suppress("/") + Word(nums, exact=2)))).set_parse_action(_DateAtom)
         date_range = (date + Suppress(":") + date).set_parse_action(_DateRangeAtom)
@@ -380,16 +506,13 @@ class PubmedQueryParser(QueryParser):
         optional_operators = []
         if self.optional_operators is not None:
             optional_operators = [(CaselessKeyword(op), 2, OpAssoc.LEFT, _BinOp) for op in self.optional_operators]
-        expression << infix_notation(atom, [(NOT, 2, OpAssoc.RIGHT, _NotOp), (OR, 2, OpAssoc.LEFT, _BinOp), (AND, 2, OpAssoc.LEFT, _BinOp)] + optional_operators)
+        expression << infix_notation(atom, [(_NOT, 2, OpAssoc.RIGHT, _NotOp), (_OR, 2, OpAssoc.LEFT, _BinOp), (_AND, 2, OpAssoc.LEFT, _BinOp)] + optional_operators)
+        return expression
 
+    def _parse(self, raw_query: str) -> _ParseNode:
         raw_query = raw_query.replace(":NoExp", ":noexp")
         try:
-            expression.scan_string(raw_query, debug=True)
-        except Exception as e:
-            print(raw_query)
-            raise e
-        try:
-            return expression.parse_string(raw_query, parse_all=True)[0]
+            return self._expression.parse_string(raw_query, parse_all=True)[0]
         except Exception as e:
             print(raw_query)
             raise e
@@ -397,24 +520,57 @@ class PubmedQueryParser(QueryParser):
     def parse_lucene(self, raw_query: str) -> Q:
         # NOTE: converting the query to a string makes the date range queries fail. (?)
         try:
-            return self._node_to_lucene(self._parse(raw_query))  # .__str__()
+            return self._node_to_lucene(self._parse_cached(raw_query))  # .__str__()
         except Exception as e:
             print(raw_query)
             raise e
 
+    def parse_lucene_batch(self, raw_queries: List[str], workers: int = os.cpu_count()) -> List[Q]:
+        """
+        Parse many queries into lucene queries, parsing several queries at once in a pool of processes.
+        Only the (pure Python) parsing happens in the pool, the lucene queries are created in this process.
+        """
+        # Forking a process that is running the JVM is not safe, so the workers are spawned instead.
+        # Each worker imports this module, which starts a JVM (as in `PubmedIndexer.read_folder_parallel`).
+        # Parsing does not use the MeSH tree or the optional fields, so the workers only get the operators,
+        # and never load the MeSH tree, since it is only loaded when a lucene query is created.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_batch_worker, initargs=(self.optional_operators,)) as executor:
+            nodes = list(executor.map(_parse_in_batch_worker, raw_queries, chunksize=max(1, len(raw_queries) // (workers * 4))))
+        return [self._node_to_lucene(node) for node in nodes]
+
     def _node_to_lucene(self, node: _ParseNode) -> Q:
         return node.__query__(tree=self.tree, optional_fields=self.optional_fields)
 
     def parse_ast(self, raw_query: str) -> ASTNode:
-        return self._parse(raw_query).__ast__()
+        return self._parse_cached(raw_query).__ast__()
+
+    def parse_both(self, raw_query: str) -> Tuple[ASTNode, Q]:
+        try:
+            return self._parse_cached(raw_query).__build__(tree=self.tree, optional_fields=self.optional_fields)
+        except Exception as e:
+            print(raw_query)
+            raise e
 
     def format(self, node: ASTNode) -> str:
         if isinstance(node, AtomNode):
             return f"{node.query}[{node.field}]"
         assert isinstance(node, OperatorNode)
-        return f"({f' {node.operator.upper()} '.join([str(x) for x in node.children])})"
+        return f"({f' {node.operator.upper()} '.join(map(str, node.children))})"
 
 
 # --------------------------------------
 #: The name of the default field that is used when no field is specified.
 _default_field = _FieldUnit([PubmedQueryParser.default_field()])
+
+# Each process in the pool of `PubmedQueryParser.parse_lucene_batch` has its own parser.
+_batch_parser: PubmedQueryParser = None
+
+
+def _init_batch_worker(optional_operators: List[str]):
+    global _batch_parser
+    _batch_parser = PubmedQueryParser(optional_operators=optional_operators)
+
+
+def _parse_in_batch_worker(raw_query: str) -> _ParseNode:
+    return _batch_parser._parse(raw_query)
@@ -3,6 +3,7 @@ Internal representations for parsing queries. These classes help with the conver
 """
 
 from abc import abstractmethod
+from typing import List
 
 import lucene
 from lupyne import engine
@@ -14,7 +15,20 @@ from pybool_ir.query.parser import MAX_CLAUSES
 assert lucene.getVMEnv() or lucene.initVM()
 Q = engine.Query
 search.BooleanQuery.setMaxClauseCount(MAX_CLAUSES)  # There is apparently a cap for efficiency reasons.
-analyzer = engine.analyzers.Analyzer.standard()
+
+# The analyzer is only created the first time a query is analyzed, since creating it goes through the JVM.
+_analyzer = None
+
+
+def _get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = engine.analyzers.Analyzer.standard()
+    return _analyzer
+
+
+# Characters that are replaced with spaces before a query is analyzed (see `UnitAtom.analyzed_query`).
+_LUCENE_SAFE_TABLE = str.maketrans({"[": " ", "]": " ", "/": " "})
 
 
 class UnitAtom(object):
@@ -22,6 +36,11 @@ class UnitAtom(object):
     A unit is the base class that represents a single query atom. There can be different kinds of atomic queries, such as a date query or a term query.
     As such, this class is the parent class for all these kinds of atomic queries.
     """
+    # The analyzed query is computed the first time it is needed, since analysis goes through the JVM.
+    # Subclasses do not call a common __init__, so the empty values are class attributes.
+    _analyzed_query = None
+    _analyzed_tokens = None
+
     @property
     @abstractmethod
     def query(self) -> str:
@@ -35,10 +54,22 @@ class UnitAtom(object):
         """
         The final, analyzed query that can be used to search with a Lucene index.
         """
-        # Although possible for query languages to include such characters inside queries,
-        # these appear to be special Lucene characters, and so must be replaced prior to analysis.
-        query = self.query.replace("[", " ").replace("]", " ").replace("/", " ")
-        return analyzer.parse(query).__str__()
+        if self._analyzed_query is None:
+            # Although possible for query languages to include such characters inside queries,
+            # these appear to be special Lucene characters, and so must be replaced prior to analysis.
+            query = self.query.translate(_LUCENE_SAFE_TABLE)
+            self._analyzed_query = _get_analyzer().parse(query).__str__()
+            self._analyzed_tokens = self._analyzed_query.split()
+        return self._analyzed_query
+
+    @property
+    def analyzed_tokens(self) -> List[str]:
+        """
+        The analyzed query, split into its individual terms.
+        """
+        if self._analyzed_tokens is None:
+            self.analyzed_query
+        return self._analyzed_tokens
 
     @property
     @abstractmethod
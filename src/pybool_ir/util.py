@@ -41,6 +41,28 @@ class StopFilter(engine.TokenFilter):
         return result
 
 
+#: The number of bytes that are read at a time when downloading a file.
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+# Redrawing the progress bar is slow compared to writing, so it is only updated after this many bytes have been written.
+_PROGRESS_INTERVAL = 1 << 20
+
+
+def _file_progress_bar(filename, max_value) -> progressbar.ProgressBar:
+    return progressbar.ProgressBar(
+        widgets=[
+            progressbar.Percentage(),
+            progressbar.Bar(),
+            str(filename),
+            "|",
+            progressbar.FileTransferSpeed(),
+            "|",
+            progressbar.ETA(),
+        ],
+        max_value=max_value,
+    )
+
+
 class ProgressFile(BufferedRWPair):
     """
     This class opens a file for reading or writing, and when it is read
@@ -65,18 +87,7 @@ class ProgressFile(BufferedRWPair):
             self.length = os.stat(filename).st_size
             max_value = self.length
         self.max_value = max_value
-        self.bar = progressbar.ProgressBar(
-            widgets=[
-                progressbar.Percentage(),
-                progressbar.Bar(),
-                str(filename),
-                "|",
-                progressbar.FileTransferSpeed(),
-                "|",
-                progressbar.ETA(),
-            ],
-            max_value=max_value,
-        )
+        self.bar = _file_progress_bar(filename, max_value)
         self.written = 0  # Used only for write mode.
 
     def read(self, size=None):
@@ -103,12 +114,40 @@ class ProgressFile(BufferedRWPair):
         self.bar.update(position + read_size)
 
 
+class _ProgressWriter:
+    """
+    Write-only counterpart to `ProgressFile`, which writes straight to a buffered file
+    and only updates the progress bar every `_PROGRESS_INTERVAL` bytes.
+    """
+
+    def __init__(self, filename, max_value):
+        self.file = open(filename, "wb", buffering=_PROGRESS_INTERVAL)
+        self.max_value = max_value
+        self.bar = _file_progress_bar(filename, max_value)
+        self.written = 0
+        self.last_reported = 0
+
+    def write(self, b: Union[bytes, bytearray]) -> int:
+        self.written += len(b)
+        if self.written - self.last_reported >= _PROGRESS_INTERVAL:
+            self.bar.update(min(self.written, self.max_value))
+            self.last_reported = self.written
+        return self.file.write(b)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file.close()
+        self.bar.finish()  # Formats the progress bar nicely at completion.
+
+
 def download_file(url: str, download_to: Path):
     """
     Helper function that downloads a file from a URL and shows a progress bar.
     """
     r = requests.get(url, stream=True, headers={'Accept-Encoding': None})
     size = int(r.headers.get("content-length"))
-    with ProgressFile(download_to, "wb", max_value=size) as f:
-        for chunk in r.iter_content(chunk_size=128):
+    with _ProgressWriter(download_to, max_value=size) as f:
+        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
             f.write(chunk)
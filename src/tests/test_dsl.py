@@ -1,21 +1,42 @@
-from pybool_ir.query.pubmed.parser import expression
+import pytest
 
+from pybool_ir.query.ast import AtomNode, OperatorNode
+from pybool_ir.query.pubmed.parser import PubmedQueryParser
 
-def test_basic():
-    result = expression.runTests('''
+
+def _structure(node):
+    """Reduce an AST to nested tuples of (operator, children) and (query, field), so that it is easy to compare."""
+    if isinstance(node, OperatorNode):
+        return node.operator, [_structure(child) for child in node.children]
+    assert isinstance(node, AtomNode)
+    return node.query, str(node.field)
+
+
+@pytest.mark.parametrize("raw_query,expected", [
     # Single expression.
-    (atom1 AND atom2)
+    ("(atom1 AND atom2)",
+     ("AND", [("atom1", "All Fields"), ("atom2", "All Fields")])),
     # Nested expression.
-    ((atom1 OR atom2) AND (atom3 OR atom4))
+    ("((atom1 OR atom2) AND (atom3 OR atom4))",
+     ("AND", [("OR", [("atom1", "All Fields"), ("atom2", "All Fields")]),
+              ("OR", [("atom3", "All Fields"), ("atom4", "All Fields")])])),
     # Single atom in expression edge case.
-    ((atom1) AND (atom2))
+    ("((atom1) AND (atom2))",
+     ("AND", [("atom1", "All Fields"), ("atom2", "All Fields")])),
     # Triplet expression.
-    (atom1 AND atom2 AND atom3)
-    # Triplet expression with multiple operators.
-    (atom1 AND atom2 OR atom3)
+    ("(atom1 AND atom2 AND atom3)",
+     ("AND", [("atom1", "All Fields"), ("atom2", "All Fields"), ("atom3", "All Fields")])),
+    # Triplet expression with multiple operators (OR binds more tightly than AND).
+    ("(atom1 AND atom2 OR atom3)",
+     ("AND", [("atom1", "All Fields"), ("OR", [("atom2", "All Fields"), ("atom3", "All Fields")])])),
     # Phrase and term atoms.
-    (atom1 AND "atom 2")
+    ('(atom1 AND "atom 2")',
+     ("AND", [("atom1", "All Fields"), ('"atom 2"', "All Fields")])),
     # Field restrictions on atoms.
-    (atom1[Title] AND atom2[Title/Abstract])
-    ''')
-    assert result[0]
+    ("(atom1[Title] AND atom2[Title/Abstract])",
+     ("AND", [("atom1", "Title"), ("atom2", "Title/Abstract")])),
+])
+def test_basic(raw_query, expected):
+    # Only the AST is created, so the MeSH tree is never loaded.
+    parser = PubmedQueryParser()
+    assert _structure(parser.parse_ast(raw_query)) == expected
@@ -0,0 +1,59 @@
+import pytest
+
+from pybool_ir.query.lqd.parser import lqd_parse, MetaFn, OPCODES, TAG_META_FN, TAG_VALUE
+
+
+def _tokens(expression):
+    """Reduce a parsed expression to a list of (tag, name or value) pairs, so that it is easy to compare."""
+    return [(tag, token.name if tag == TAG_META_FN else token.value) for tag, token in expression.expression_list]
+
+
+@pytest.mark.parametrize("raw_query,expected", [
+    # Meta function on its own.
+    (".docs", [(TAG_META_FN, ".docs")]),
+    # Meta function written with a space after the dot.
+    (". doc 1", [(TAG_META_FN, ".doc"), (TAG_VALUE, 1)]),
+    # Quoted ids may contain dots and dashes.
+    ('.doc "PMC-123.4"', [(TAG_META_FN, ".doc"), (TAG_VALUE, "PMC-123.4")]),
+    # Integers, surrounded by any amount of whitespace.
+    ("  .ith  2 10  ", [(TAG_META_FN, ".ith"), (TAG_VALUE, 2), (TAG_VALUE, 10)]),
+])
+def test_parse(raw_query, expected):
+    expression, ok = lqd_parse(raw_query)
+    assert ok
+    assert _tokens(expression) == expected
+
+
+def test_opcodes():
+    expression, ok = lqd_parse(". select")
+    assert ok
+    (_, token), = expression.expression_list
+    assert isinstance(token, MetaFn)
+    assert OPCODES[token.opcode] == ".select"
+    # Unknown meta functions are still parsed, but have no opcode.
+    expression, ok = lqd_parse(".unknown")
+    assert ok
+    assert expression.expression_list[0][1].opcode == -1
+
+
+def test_integer_values_are_ints():
+    expression, ok = lqd_parse("42")
+    assert ok
+    (_, token), = expression.expression_list
+    assert token.is_int() and token.value == 42
+
+
+@pytest.mark.parametrize("raw_query", [
+    # Empty input.
+    "",
+    "   ",
+    # Trailing garbage after valid tokens.
+    ".doc 1 ?",
+    '.doc "unterminated',
+    # Characters that are not allowed in quoted ids.
+    '.doc "a b"',
+])
+def test_parse_error(raw_query):
+    error, ok = lqd_parse(raw_query)
+    assert not ok
+    assert isinstance(error, Exception)
@@ -0,0 +1,18 @@
+from pybool_ir.query.ovid import _convert_to_one_line
+
+
+def test_line_numbers_are_replaced():
+    q = _convert_to_one_line(["heart", "attack", "1 or 2"])
+    assert q[3] == "( ( heart ) or ( attack ) )"
+
+
+def test_line_number_at_start_of_line():
+    # The number is not next to an operator, so it is kept; the last term of the line must not be treated as its neighbour.
+    q = _convert_to_one_line(["heart", "2 weeks or"])
+    assert q[2] == "( 2 weeks or )"
+
+
+def test_line_number_at_end_of_line():
+    # A number at the end of a line has no term after it, which used to raise an IndexError.
+    q = _convert_to_one_line(["children aged 5"])
+    assert q[1] == "( children aged 5 )"